@@ -75,14 +75,21 @@ def install():
     pip()
 
 
+def warmcache():
+    """Check the shared cache and fill it with the common API lists."""
+    local("python manage.py warm_cache")
+
+
 def deploy():
     """Refresh application. Run after code update.
 
-    Installs dependencies, runs syncdb and migrations, re-links static files.
+    Installs dependencies, runs syncdb and migrations, re-links static files
+    and warms the cache.
     """
     install()
     quickdeploy()
     migrate()
+    warmcache()
 
 
 def cleandeploy():
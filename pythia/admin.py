@@ -5,9 +5,8 @@ from __future__ import unicode_literals
 from collections import namedtuple
 from functools import update_wrapper, partial
 from itertools import chain
+import json
 import logging
-import os
-import subprocess
 
 from guardian.admin import GuardedModelAdmin
 from reversion.models import Version
@@ -41,10 +40,12 @@ from django_tablib.admin import TablibAdmin
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import never_cache
 
+from pythia import tasks
 from pythia.forms import (
     SdisModelForm, BaseInlineEditForm,
     PythiaUserCreationForm, PythiaUserChangeForm)
 from pythia.fields import Html2TextField, PythiaArrayField
+from pythia.models import PDFBuild
 from pythia.widgets import ArrayFieldWidget, InlineEditWidgetWrapper
 
 logger = logging.getLogger(__name__)
@@ -534,6 +535,10 @@ class DownloadAdminMixin(ModelAdmin, NeverCacheMixin):
                 wrap(self.pdf),
                 name='%s_%s_download_pdf' % info),
 
+            url(r'^(\d+)/download/pdf/(\d+)/$',
+                wrap(self.pdf_status),
+                name='%s_%s_download_pdf_status' % info),
+
             url(r'^(\d+)/download/html/$',
                 wrap(self.simplehtml),
                 name='%s_%s_download_html' % info),
@@ -584,117 +589,56 @@ class DownloadAdminMixin(ModelAdmin, NeverCacheMixin):
 
     @never_cache
     def pdf(self, request, object_id):
-        """Render as PDF using Latex."""
+        """Queue a PDF build using Latex and redirect to its status page.
+
+        A pending build of the same object is reused, see
+        ``PDFBuild.request``.
+        """
         obj = self.get_object(request, unquote(object_id))
+        if obj is None:
+            raise Http404
         logger.info("PDF requested by {0} of {1}".format(request.user, obj))
-        template = self.download_template
-        texname = template + ".tex"
-        filename = template + ".pdf"
-        logfile = template + ".log"
-        now = timezone.localtime(timezone.now())
-        # timestamp = now.isoformat().rsplit(".")[0].replace(":", "")[:-2]
-        downloadname = obj.__str__()
-        context = {
-            'original': obj,
-            'embed': request.GET.get("embed", True),
-            'headers': request.GET.get("headers", True),
-            'title': obj.download_title,
-            'subtitle': obj.download_subtitle,
-            'timestamp': now,
-            'downloadname': downloadname,
-            'baseurl': request.build_absolute_uri("/")[:-1],
-            'STATIC_ROOT': settings.STATIC_ROOT,
-            'MEDIA_ROOT': settings.MEDIA_ROOT,
-            'link_sdis': False
-        }
+        pdf_build, created = PDFBuild.request(
+            obj, self.download_template,
+            user=request.user,
+            baseurl=request.build_absolute_uri("/")[:-1],
+            embed="embed" not in request.GET,
+            headers="headers" not in request.GET)
+        if created:
+            tasks.enqueue_pdf_build(pdf_build)
 
-        if not request.GET.get("download", False):
-            disposition = "inline"
-        else:
-            disposition = "attachment"
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return HttpResponseRedirect(reverse(
+            'admin:%s_%s_download_pdf_status' % info,
+            args=(obj.pk, pdf_build.pk)))
+
+    @never_cache
+    def pdf_status(self, request, object_id, build_id):
+        """Show the status of a PDF build, redirect to the PDF when done.
 
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = '{0}; filename="{1}.pdf"'.format(
-                disposition, downloadname)
+        Returns the status as JSON to AJAX requests and with ``?format=json``.
+        """
+        obj = self.get_object(request, unquote(object_id))
+        if obj is None:
+            raise Http404
+        pdf_build = get_object_or_404(
+            PDFBuild, pk=build_id, object_id=obj.pk,
+            content_type=ContentType.objects.get_for_model(obj))
 
-        logger.info("PDF export: render to string")
-        output = render_to_string(
-            "latex/" + template + ".tex", context,
-            context_instance=RequestContext(request))
+        if request.is_ajax() or request.GET.get("format") == "json":
+            return HttpResponse(json.dumps(pdf_build.as_dict()),
+                                content_type="application/json")
 
-        directory = os.path.join(settings.MEDIA_ROOT, "reports", str(obj.id))
-        if not os.path.exists(directory):
-            os.makedirs(directory)
-        pdffile = os.path.join(directory, filename)
-
-        # symlink MEDIA_ROOT so that relative project image paths work from
-        # within the PDF directory
-        virtual_media_root = os.path.join(directory, 'media')
-        if not os.path.lexists(virtual_media_root):
-            os.symlink(settings.MEDIA_ROOT, virtual_media_root)
-        if not os.path.lexists(virtual_media_root):
-            logger.error("Virtual media root not linked!")
-
-        if os.path.exists(pdffile):
-            logger.info("PDF export: deleting old PDF")
-            os.remove(pdffile)
-            
-        with open(os.path.join(directory, texname), "w") as f:
-            f.write(output.encode('utf-8'))
-
-        logger.info("PDF export: processing tex to PDF")
-        cmd = ['lualatex', "--interaction", "batchmode", "--output-directory",
-               directory, texname]
-        try:
-            for i in range(2):
-                # 2 passes for numbering
-                try:
-                    subprocess.check_output(cmd)
-                except subprocess.CalledProcessError as e:
-                    # logger.error("Expected return from lualatex: {0}".format(e))
-                    pass
-        except subprocess.CalledProcessError as e:
-            if not os.path.exists(pdffile):
-                logger.error("Error creating PDF, returning log instead.")
-                
-                with open(logfile, "r") as f:
-                    response = HttpResponse(content_type='text')
-                    response.write(f.read())
-                return response
-            else:
-                raise
-
-        if not os.path.exists(pdffile):
-            logger.error("Error creating PDF!")
-            if os.path.exists(logfile):
-                with open(logfile, "r") as f:
-                    response = HttpResponse(content_type='text')
-                    response.write(f.read())
-            return response
-
-        try:
-            logger.info("Writing PDF to object")
-            from django.core.files import File
-            with open(pdffile) as f:
-                obj.pdf.save("{0}.pdf".format(downloadname), File(f))
-                obj.save()
-            logger.info("Saving PDF to object field 'pdf' finished.")
-        except e:
-            logger.info("Writing PDF to object failed: {0}".format(e))
-            pass
-
-        msg = mark_safe('PDF available <a href="{0}">here</a>.'.format(obj.pdf.url))
-        logger.info(msg)
-        messages.success(request, msg)
-
-        return HttpResponseRedirect(obj.get_absolute_url())
-
-        # # Read *.pdf to response
-        # with open(pdffile, "r") as f:
-        #     response.write(f.read())
-
-        # return response
+        if pdf_build.pdf_url:
+            return HttpResponseRedirect(pdf_build.pdf_url)
 
+        return TemplateResponse(request, "admin/pdf_build.html", {
+            'title': "PDF of {0}".format(obj),
+            'original': obj,
+            'opts': self.model._meta,
+            'pdf_build': pdf_build,
+            'refresh': getattr(settings, "PDF_STATUS_REFRESH", 5),
+        }, current_app=self.admin_site.name)
 
     def latex(self, request, object_id):
         """Render as Latex source code."""
@@ -1,6 +1,21 @@
 """SDIS API."""
-
-from rest_framework import serializers, viewsets, routers, filters
+import calendar
+import hashlib
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.urlresolvers import reverse
+from django.db.models import Count, Max
+from django.http import (
+    HttpResponse, HttpResponseNotModified, StreamingHttpResponse)
+from django.utils.encoding import force_text
+from django.utils.http import (
+    http_date, parse_etags, parse_http_date_safe, quote_etag)
+
+from rest_framework import serializers, status, viewsets, routers, filters
+from rest_framework.response import Response
+from rest_framework.renderers import JSONRenderer
+from rest_framework_csv.renderers import CSVStreamingRenderer
 # from rest_framework.renderers import BrowsableAPIRenderer
 # from rest_framework_latex import renderers
 # from dynamic_rest import serializers as ds, viewsets as dv
@@ -11,6 +26,7 @@ from rest_framework import serializers, viewsets, routers, filters
 # from rest_framework.authentication import (
 # SessionAuthentication, BasicAuthentication, TokenAuthentication)
 
+from pythia import apicache
 from pythia.models import (
     Program, Service, Division,
     # WebResource, Service,
@@ -197,7 +213,7 @@ class ProjectSerializer(serializers.HyperlinkedModelSerializer):
     program = ProgramSerializer() # serializers.RelatedField()
     cost_center = serializers.Field()
     status_active = serializers.Field()
-    absolute_url = serializers.Field()
+    absolute_url = serializers.SerializerMethodField('admin_url')
     output_program = ServiceSerializer(read_only = True)
     read_only_fields = (
         'id',
@@ -250,6 +266,17 @@ class ProjectSerializer(serializers.HyperlinkedModelSerializer):
             'image',
         )
 
+    def admin_url(self, obj):
+        """Return the admin URL of the project's class without downcasting.
+
+        Lists contain plain Projects, see ``ProjectViewSet.get_queryset``.
+        """
+        model = ContentType.objects.get_for_id(
+            obj.polymorphic_ctype_id).model_class() if (
+            obj.polymorphic_ctype_id) else type(obj)
+        return reverse("admin:{0}_{1}_change".format(
+            model._meta.app_label, model._meta.model_name), args=(obj.pk, ))
+
 
 class FullProjectSerializer(ProjectSerializer):
     """A comprehensive Project serializer to view project details."""
@@ -338,11 +365,214 @@ class FullProjectSerializer(ProjectSerializer):
 #             'image': '__all__',
 #         }
 
+# -----------------------------------------------------------------------------#
+# Exports
+def serializer_columns(serializer, prefix=''):
+    """Return the CSV column names of a serializer's (nested) fields."""
+    for name, field in serializer.fields.items():
+        if isinstance(field, serializers.BaseSerializer):
+            for column in serializer_columns(field, prefix + name + '.'):
+                yield column
+        else:
+            yield prefix + name
+
+
+class StreamingExportMixin(object):
+    """Stream lists of all objects as JSON array or CSV rows.
+
+    Exports are lists requested as CSV or as JSON with the `export`
+    parameter, e.g. `?format=csv` or `?format=json&export`. Exports are not
+    paginated, and read the objects in chunks of `API_EXPORT_CHUNK_SIZE`
+    ordered by primary key, so memory use does not grow with the number of
+    objects.
+    """
+
+    def is_export(self):
+        """Whether the request is an export."""
+        renderer_format = self.request.accepted_renderer.format
+        return renderer_format == 'csv' or (
+            renderer_format == 'json' and
+            'export' in self.request.QUERY_PARAMS)
+
+    def list(self, request, *args, **kwargs):
+        """Stream exports, return other lists as usual."""
+        if not self.is_export():
+            return super(StreamingExportMixin, self).list(
+                request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        renderer = request.accepted_renderer
+        if renderer.format == 'csv':
+            content = self.export_csv(queryset)
+        else:
+            content = self.export_json(queryset)
+        response = StreamingHttpResponse(
+            content, content_type='{0}; charset=utf-8'.format(
+                renderer.media_type))
+        if renderer.format == 'csv':
+            response['Content-Disposition'] = (
+                'attachment; filename="{0}.csv"'.format(force_text(
+                    queryset.model._meta.verbose_name_plural).lower()))
+        return response
+
+    def export_objects(self, queryset):
+        """Yield the serialized objects, reading chunks by primary key."""
+        size = settings.API_EXPORT_CHUNK_SIZE
+        queryset = queryset.order_by('pk')
+        chunk = list(queryset[:size])
+        while chunk:
+            for data in self.get_serializer(chunk, many=True).data:
+                yield data
+            chunk = list(queryset.filter(pk__gt=chunk[-1].pk)[:size])
+
+    def export_json(self, queryset):
+        """Yield a JSON array of the objects."""
+        renderer = JSONRenderer()
+        separator = b'['
+        for data in self.export_objects(queryset):
+            yield separator + renderer.render(data)
+            separator = b','
+        yield b'[]' if separator == b'[' else b']'
+
+    def export_csv(self, queryset):
+        """Yield CSV rows of the objects with a header of all fields."""
+        header = sorted(serializer_columns(self.get_serializer()))
+        return CSVStreamingRenderer().render(
+            self.export_objects(queryset), renderer_context={'header': header})
+
+
+# -----------------------------------------------------------------------------#
+# Conditional responses
+class ConditionalListMixin(object):
+    """Answer requests for unchanged lists with 304 Not Modified.
+
+    The validators of a list are the number of its objects and the latest
+    `modified` time of `validator_fields`, which are read with one query.
+    Lists send them as `ETag` and `Last-Modified`, and requests with a
+    matching `If-None-Match` or `If-Modified-Since` are not serialized.
+    The ETag also covers the ``pythia.apicache`` generations of the
+    `cache_models`, which change with cached fields that are written
+    without touching `modified`.
+    """
+
+    validator_fields = ('modified', )
+
+    def list_validators(self, queryset):
+        """Return the ETag and last modified time of a list."""
+        values = queryset.order_by().aggregate(
+            count=Count('pk'), *[Max(f) for f in self.validator_fields])
+        times = [values['{0}__max'.format(f)] for f in self.validator_fields]
+        last_modified = max([t for t in times if t is not None] or [None])
+        labels = getattr(self, 'cache_models', ())
+        etag = hashlib.md5('|'.join([
+            self.request.get_full_path(),
+            self.request.accepted_media_type,
+            str(values['count'])] + [
+            t.isoformat() if t else '' for t in times] + [
+            str(g) for g in apicache.generations(labels)]).encode('utf-8'))
+        return etag.hexdigest(), last_modified
+
+    def list(self, request, *args, **kwargs):
+        """Return 304 Not Modified or the list with its validators."""
+        etag, last_modified = self.list_validators(
+            self.filter_queryset(self.get_queryset()))
+        if last_modified:
+            last_modified = timestamp(last_modified)
+        if is_not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = super(ConditionalListMixin, self).list(
+                request, *args, **kwargs)
+        set_validators(response, etag, last_modified)
+        return response
+
+
+def timestamp(value):
+    """Return a datetime as seconds since the epoch."""
+    return calendar.timegm(value.utctimetuple())
+
+
+def is_not_modified(request, etag, last_modified):
+    """Whether a request's validators match an ETag and timestamp."""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        etags = parse_etags(if_none_match)
+        return etag in etags or '*' in etags
+    if_modified_since = parse_http_date_safe(
+        request.META.get('HTTP_IF_MODIFIED_SINCE'))
+    return bool(last_modified and if_modified_since and
+                last_modified <= if_modified_since)
+
+
+def set_validators(response, etag, last_modified):
+    """Send an ETag and timestamp as response headers."""
+    if etag:
+        response['ETag'] = quote_etag(etag)
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+
+
+# -----------------------------------------------------------------------------#
+# Cached lists
+class CachedListMixin(object):
+    """Serve repeated JSON list requests from ``pythia.apicache``.
+
+    Lists are cached per request and generation of the `cache_models`,
+    which must be watched by ``pythia.apicache.WATCHED_MODELS``. Exports
+    and other formats are not cached.
+    """
+
+    cache_models = ()
+
+    def list(self, request, *args, **kwargs):
+        """Return a cached list, or list and cache after rendering."""
+        self.list_cache_key = None
+        if (request.accepted_renderer.format != 'json' or
+                'export' in request.QUERY_PARAMS):
+            return super(CachedListMixin, self).list(
+                request, *args, **kwargs)
+
+        name = type(self).__name__
+        key = apicache.response_key(name, request, self.cache_models)
+        entry = apicache.lookup(name, key)
+        if entry is None:
+            self.list_cache_key = key
+            return super(CachedListMixin, self).list(
+                request, *args, **kwargs)
+
+        if is_not_modified(request, entry['etag'], entry['last_modified']):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(
+                entry['content'], content_type=entry['content_type'])
+        set_validators(response, entry['etag'], entry['last_modified'])
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Cache a rendered list response."""
+        response = super(CachedListMixin, self).finalize_response(
+            request, response, *args, **kwargs)
+        if (getattr(self, 'list_cache_key', None) and
+                response.status_code == 200 and
+                isinstance(response, Response)):
+            response.render()
+            etag = response.get('ETag')
+            apicache.store(self.list_cache_key, {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'etag': parse_etags(etag)[0] if etag else None,
+                'last_modified': parse_http_date_safe(
+                    response.get('Last-Modified')),
+            })
+        return response
+
+
 # -----------------------------------------------------------------------------#
 # Viewsets
 
 
-class AreaViewSet(viewsets.ModelViewSet):
+class AreaViewSet(CachedListMixin, ConditionalListMixin,
+                  StreamingExportMixin, viewsets.ModelViewSet):
     """A clever Area ViewSet that returns fast lists and full details.
 
     The detail page contains a GeoJSON geometry (MultiPolygon) for each area.
@@ -365,10 +595,17 @@ class AreaViewSet(viewsets.ModelViewSet):
     """
 
     queryset = Area.objects.all()
+    cache_models = ('pythia.area', )
     filter_fields = (
         'area_type',
     )
 
+    def get_queryset(self):
+        """Lists do not contain the geometry."""
+        if self.action == 'list':
+            return Area.objects.defer('mpoly')
+        return Area.objects.all()
+
     def get_serializer_class(self):
         """Toggle serializer: Minimal list, full details."""
         if self.action == 'list':
@@ -378,19 +615,22 @@ class AreaViewSet(viewsets.ModelViewSet):
         return FullAreaSerializer
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(StreamingExportMixin, viewsets.ModelViewSet):
     """A default User ViewSet."""
 
-    queryset = User.objects.all()
+    queryset = User.objects.select_related(
+        'program__division__director', 'program__division__approver')
     serializer_class = UserSerializer
 
 
-class DivisionViewSet(viewsets.ModelViewSet):
+class DivisionViewSet(CachedListMixin, viewsets.ModelViewSet):
     queryset = Division.objects.all()
+    cache_models = ('pythia.division', 'pythia.user')
     serializer_class = DivisionSerializer
 
 
-class ProgramViewSet(viewsets.ModelViewSet):
+class ProgramViewSet(CachedListMixin, ConditionalListMixin,
+                     viewsets.ModelViewSet):
     """A clever Program ViewSet that returns fast lists and full details.
 
     The detail page provides more fields.
@@ -403,6 +643,8 @@ class ProgramViewSet(viewsets.ModelViewSet):
     """
 
     queryset = Program.objects.all()
+    cache_models = ('pythia.program', 'pythia.division', 'pythia.user')
+    validator_fields = ('modified', 'division__modified')
 
     filter_fields = ("published", )
 
@@ -415,7 +657,8 @@ class ProgramViewSet(viewsets.ModelViewSet):
         return FullProgramSerializer
 
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(CachedListMixin, ConditionalListMixin,
+                     StreamingExportMixin, viewsets.ModelViewSet):
     """A list of publishable projects with more comprehensive detail views.
 
     Publishable are all approved or successfully completed projects.
@@ -460,9 +703,28 @@ class ProjectViewSet(viewsets.ModelViewSet):
       /api/projects/?search=adaptive
     * All projects in (at least) DBCA District Moora:
       /api/projects/?search=Moora
+
+    Pagination
+    Lists return pages of `API_PROJECT_PAGE_SIZE` projects as
+    `{count, next, previous, results}`, exports stream all projects.
+
+    * /api/projects/?page=2
+    * Up to 1000 projects per page: /api/projects/?page_size=1000
+    * All projects: /api/projects/?format=csv
+    * All projects as JSON array: /api/projects/?format=json&export
+
+    Lists send `ETag` and `Last-Modified` headers, repeated requests with
+    `If-None-Match` or `If-Modified-Since` return 304 Not Modified until
+    the projects change.
     """
 
     queryset = Project.objects.all()
+    paginate_by = settings.API_PROJECT_PAGE_SIZE
+    cache_models = ('projects.project', 'projects.projectmembership',
+                    'pythia.program', 'pythia.service', 'pythia.division',
+                    'pythia.user')
+    validator_fields = ('modified', 'program__modified',
+                        'output_program__modified')
     filter_backends = (filters.SearchFilter, )
     filter_fields = (
         # 'status',
@@ -492,6 +754,24 @@ class ProjectViewSet(viewsets.ModelViewSet):
         'area_list_dpaw_district',
     )
 
+    list_related = (
+        'program__division__director',
+        'program__division__approver',
+        'program__program_leader',
+        'output_program__director',
+    )
+
+    def get_queryset(self):
+        """Return plain Projects with their related objects for lists.
+
+        ``ProjectSerializer`` only needs fields of Project, so lists skip
+        the polymorphic downcasting queries per project type.
+        """
+        if self.action == 'list':
+            return Project.objects.non_polymorphic().select_related(
+                *self.list_related)
+        return Project.objects.all()
+
     def get_serializer_class(self):
         """Toggle serializer: Minimal list, full details."""
         if self.action == 'list':
@@ -0,0 +1,172 @@
+"""A versioned cache of rendered API list responses.
+
+Lists are cached by the normalized request (URL, sorted query parameters
+and media type) and the generation of each model they show. Saving or
+deleting a watched model, or changing its many-to-many relations, bumps its
+generation, so that cached lists showing it are no longer found and expire
+after ``settings.API_CACHE_TIMEOUT`` seconds. Bulk updates bypassing the
+signals call ``bump()`` themselves.
+
+Generations, responses and hit counters live in the Django cache
+``settings.API_CACHE_ALIAS``, and are shared by all processes if the
+backend is. Hits and misses are counted per list, see ``stats()`` and the
+``api_cache_stats`` command.
+"""
+from __future__ import (division, print_function, unicode_literals,
+                        absolute_import)
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import get_cache
+from django.utils.encoding import force_bytes
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "api"
+
+# Models shown in cached lists, see CachedListMixin.cache_models
+WATCHED_MODELS = frozenset([
+    "pythia.area",
+    "pythia.division",
+    "pythia.program",
+    "pythia.service",
+    "pythia.user",
+    "projects.project",
+    "projects.projectmembership",
+])
+
+# Fields of watched models no cached list shows
+UNLISTED_FIELDS = frozenset(["last_login"])
+
+
+def backend():
+    """The Django cache holding generations, lists and counters."""
+    return get_cache(getattr(settings, "API_CACHE_ALIAS", "default"))
+
+
+def model_labels(model):
+    """Return the labels of a model and of its concrete parents."""
+    model = model._meta.concrete_model
+    return set("{0}.{1}".format(m._meta.app_label, m._meta.model_name)
+               for m in [model] + list(model._meta.get_parent_list()))
+
+
+def generation_key(label):
+    """Return the cache key of a model's generation."""
+    return "{0}:generation:{1}".format(KEY_PREFIX, label)
+
+
+def start_generation(key):
+    """Start a missing generation.
+
+    Generations start from the current time, so that a generation evicted
+    from the cache does not repeat an earlier one.
+    """
+    backend().add(key, int(time.time() * 1000), None)
+
+
+def generations(labels):
+    """Return the current generation of each model label."""
+    keys = [generation_key(label) for label in labels]
+    values = backend().get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        for key in missing:
+            start_generation(key)
+        values.update(backend().get_many(missing))
+    return [values.get(key) for key in keys]
+
+
+def bump(*models):
+    """Invalidate the cached lists showing any of the models."""
+    labels = set()
+    for model in models:
+        labels.update(model_labels(model))
+    for label in labels & WATCHED_MODELS:
+        key = generation_key(label)
+        try:
+            backend().incr(key)
+        except ValueError:
+            start_generation(key)
+
+
+def model_changed(sender, update_fields=None, **kwargs):
+    """Bump the generation of a saved or deleted model.
+
+    Saves of fields no list shows, e.g. ``User.last_login`` on each login,
+    keep the generation.
+    """
+    if update_fields and set(update_fields) <= UNLISTED_FIELDS:
+        return
+    bump(sender)
+
+
+def relation_changed(sender, instance, action, model, **kwargs):
+    """Bump the generations of both sides of a changed relation."""
+    if action.startswith("post_"):
+        bump(sender, type(instance), model)
+
+
+def response_key(name, request, labels):
+    """Return the cache key of a list request."""
+    digest = hashlib.sha1()
+    params = sorted((key, sorted(values))
+                    for key, values in request.QUERY_PARAMS.lists())
+    for part in [request.build_absolute_uri(request.path),
+                 request.accepted_media_type, params] + generations(labels):
+        digest.update(force_bytes(part))
+        digest.update(b"\0")
+    return "{0}:list:{1}:{2}".format(KEY_PREFIX, name, digest.hexdigest())
+
+
+def counter_key(name, counter):
+    """Return the cache key of a list's hit or miss counter."""
+    return "{0}:stats:{1}:{2}".format(KEY_PREFIX, name, counter)
+
+
+def count(name, counter):
+    """Increment a list's hit or miss counter."""
+    key = counter_key(name, counter)
+    try:
+        backend().incr(key)
+    except ValueError:
+        if not backend().add(key, 1, None):
+            backend().incr(key)
+
+
+def lookup(name, key):
+    """Return a cached list response as dict or None, and count it."""
+    entry = backend().get(key)
+    count(name, "misses" if entry is None else "hits")
+    return entry
+
+
+def store(key, entry):
+    """Cache a list response."""
+    backend().set(key, entry, getattr(settings, "API_CACHE_TIMEOUT", 3600))
+
+
+def stats(names):
+    """Return the hits, misses and hit ratio of each named list."""
+    keys = [counter_key(name, counter)
+            for name in names for counter in ("hits", "misses")]
+    values = backend().get_many(keys)
+    result = {}
+    for name in names:
+        hits = values.get(counter_key(name, "hits"), 0)
+        misses = values.get(counter_key(name, "misses"), 0)
+        result[name] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / (hits + misses) if hits + misses else None,
+        }
+    return result
+
+
+def reset_stats(names):
+    """Reset the hit and miss counters of the named lists."""
+    backend().delete_many([counter_key(name, counter)
+                           for name in names
+                           for counter in ("hits", "misses")])
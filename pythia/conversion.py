@@ -0,0 +1,269 @@
+"""Cached pandoc conversions for the Latex templates.
+
+Every call to ``pypandoc.convert_text`` spawns a fresh pandoc process, and the
+annual report converts thousands of rich text fields per render.
+Conversions are therefore cached by a hash of the pandoc version, the source
+and target formats, and the source text:
+
+* in memory, per process, with least-recently-used eviction after
+  ``settings.PANDOC_CACHE_MAX_ENTRIES`` entries, and
+* in the Django cache ``settings.PANDOC_CACHE_ALIAS`` for
+  ``settings.PANDOC_CACHE_TIMEOUT`` seconds, which persists conversions across
+  requests and, with a shared cache backend, across processes.
+
+Hits and misses are counted, see ``stats()``.
+
+Simple HTML is converted to Latex in-process by ``pythia.html2tex``, unless
+``settings.PANDOC_NATIVE_HTML2LATEX`` is False. Only markup it does not handle
+is converted, and cached, as above.
+
+Whole documents are best converted up front with ``convert_many()``, which
+converts all uncached fragments in a few batched pandoc calls and primes the
+cache, so that rendering the Latex templates starts no pandoc process.
+"""
+from __future__ import (division, print_function, unicode_literals,
+                        absolute_import)
+from collections import OrderedDict
+import hashlib
+import logging
+from multiprocessing.pool import ThreadPool
+import re
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import get_cache
+from django.utils.encoding import force_bytes, force_text
+import pypandoc
+
+from pythia import html2tex
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "pandoc"
+
+NATIVE = getattr(settings, "PANDOC_NATIVE_HTML2LATEX", True)
+
+# Sentinel paragraphs separating fragments in batched conversions
+SENTINEL = "PYTHIABATCHSPLIT"
+
+
+class ConversionCache(object):
+    """A size-bounded, content-addressed cache of pandoc conversions."""
+
+    def __init__(self, max_entries=5000, alias="default", timeout=None):
+        """Set up an empty in-memory cache backed by a Django cache."""
+        self.max_entries = max_entries
+        self.alias = alias
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._pandoc_version = None
+        self.reset_stats()
+
+    @property
+    def pandoc_version(self):
+        """The pandoc version, looked up once per process."""
+        if self._pandoc_version is None:
+            self._pandoc_version = force_text(pypandoc.get_pandoc_version())
+        return self._pandoc_version
+
+    @property
+    def backend(self):
+        """The Django cache backing the in-memory cache."""
+        return get_cache(self.alias)
+
+    def key(self, value, to, format):
+        """Return the content address of a conversion."""
+        digest = hashlib.sha1()
+        for part in (self.pandoc_version, format, to, value):
+            digest.update(force_bytes(part))
+            digest.update(b"\0")
+        return "{0}:{1}".format(KEY_PREFIX, digest.hexdigest())
+
+    def get(self, key):
+        """Return a cached conversion or None."""
+        with self._lock:
+            if key in self._entries:
+                result = self._entries.pop(key)
+                self._entries[key] = result
+                self.memory_hits += 1
+                return result
+
+        result = self.backend.get(key)
+        if result is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.shared_hits += 1
+        self._remember(key, result)
+        return result
+
+    def set(self, key, result):
+        """Cache a conversion in memory and in the Django cache."""
+        self._remember(key, result)
+        self.backend.set(key, result, self.timeout)
+
+    def _remember(self, key, result):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = result
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Forget all in-memory conversions and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset hit and miss counters."""
+        self.memory_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.native = 0
+        self.fallbacks = 0
+
+    def stats(self):
+        """Return hit and miss counters as dict."""
+        hits = self.memory_hits + self.shared_hits
+        lookups = hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "memory_hits": self.memory_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "native": self.native,
+            "fallbacks": self.fallbacks,
+            "hit_ratio": hits / lookups if lookups else None,
+        }
+
+
+conversions = ConversionCache(
+    max_entries=getattr(settings, "PANDOC_CACHE_MAX_ENTRIES", 5000),
+    alias=getattr(settings, "PANDOC_CACHE_ALIAS", "default"),
+    timeout=getattr(settings, "PANDOC_CACHE_TIMEOUT", 60 * 60 * 24 * 30))
+
+
+def convert_native(value, to, format):
+    """Return ``value`` converted in-process, or None if not supported."""
+    if not (NATIVE and format == "html" and to in ("tex", "latex")):
+        return None
+    try:
+        result = html2tex.convert(value)
+    except html2tex.Unsupported as e:
+        logger.debug("Converting with pandoc, unsupported HTML: {0}".format(e))
+        conversions.fallbacks += 1
+        return None
+    conversions.native += 1
+    return result
+
+
+def convert(value, to, format):
+    """Return ``value`` converted, from cache if possible."""
+    value = force_text(value)
+    if not value:
+        return ""
+    result = convert_native(value, to, format)
+    if result is not None:
+        return result
+    key = conversions.key(value, to, format)
+    result = conversions.get(key)
+    if result is None:
+        result = force_text(pypandoc.convert_text(value, to, format=format))
+        conversions.set(key, result)
+    return result
+
+
+def _convert_batch(values, to, format):
+    """Convert a list of fragments in one pandoc call.
+
+    The fragments are joined by sentinel paragraphs and the output is split
+    on them again. If a fragment swallows or mangles a sentinel, e.g. through
+    unclosed tags, the fragments are converted one by one instead.
+    """
+    token = SENTINEL + uuid.uuid4().hex
+    separator = "\n\n<p>{0}</p>\n\n".format(token)
+    output = force_text(pypandoc.convert_text(
+        separator.join(values), to, format=format))
+    parts = re.split(r"^{0}$".format(token), output, flags=re.MULTILINE)
+    if len(parts) != len(values):
+        logger.warning("Batched pandoc conversion of {0} fragments returned "
+                       "{1} parts, converting one by one".format(
+                           len(values), len(parts)))
+        return [force_text(pypandoc.convert_text(v, to, format=format))
+                for v in values]
+    return [p.strip("\n") + "\n" if p.strip() else "" for p in parts]
+
+
+def convert_many(values, to, format, batch_size=None, workers=None):
+    """Convert many fragments, return a dict of fragment to conversion.
+
+    Cached fragments are looked up, the others are converted in batches of
+    ``batch_size`` fragments by ``workers`` parallel pandoc processes and
+    cached.
+    """
+    batch_size = batch_size or getattr(settings, "PANDOC_BATCH_SIZE", 200)
+    workers = workers or getattr(settings, "PANDOC_BATCH_WORKERS", 4)
+    results = {"": ""}
+    todo = OrderedDict()
+    for value in values:
+        value = force_text(value)
+        if value in results or value in todo:
+            continue
+        result = convert_native(value, to, format)
+        if result is not None:
+            results[value] = result
+            continue
+        key = conversions.key(value, to, format)
+        result = conversions.get(key)
+        if result is None:
+            todo[value] = key
+        else:
+            results[value] = result
+
+    if todo:
+        pending = list(todo)
+        batches = [pending[i:i + batch_size]
+                   for i in range(0, len(pending), batch_size)]
+        logger.info("Converting {0} fragments in {1} pandoc batches".format(
+            len(pending), len(batches)))
+        pool = ThreadPool(min(workers, len(batches)))
+        try:
+            converted = pool.map(
+                lambda batch: _convert_batch(batch, to, format), batches)
+        finally:
+            pool.close()
+            pool.join()
+        for batch, batch_results in zip(batches, converted):
+            for value, result in zip(batch, batch_results):
+                conversions.set(todo[value], result)
+                results[value] = result
+
+    if len(results) > conversions.max_entries:
+        logger.warning("{0} conversions exceed PANDOC_CACHE_MAX_ENTRIES, "
+                       "some will be looked up in the Django cache".format(
+                           len(results)))
+    return results
+
+
+def html2latex(value):
+    """Convert an HTML string to a Latex string."""
+    return convert(value, "tex", "html")
+
+
+def prime_html2latex(values):
+    """Convert HTML fragments to Latex in batches ahead of rendering."""
+    return convert_many(values, "tex", "html")
+
+
+def stats():
+    """Return the conversion cache counters."""
+    return conversions.stats()
@@ -0,0 +1,51 @@
+"""Rebuild or check the materialized task inbox."""
+from __future__ import (division, print_function, unicode_literals,
+                        absolute_import)
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from pythia.documents.models import Task, replace_tasks, user_tasks
+from pythia.models import User
+
+
+class Command(BaseCommand):
+    """Rebuild the task inbox from ``User.tasklist``."""
+
+    help = "Rebuild the task inbox, or check it with --check."
+    option_list = BaseCommand.option_list + (
+        make_option(
+            "--check", action="store_true", dest="check", default=False,
+            help="Compare the task inbox with User.tasklist, don't rebuild."),
+    )
+
+    def handle(self, *args, **options):
+        """Rebuild or check the tasks of all users."""
+        if options["check"]:
+            return self.check_tasks()
+        with transaction.atomic():
+            Task.objects.all().delete()
+            for user in User.objects.all():
+                replace_tasks(Task.objects.filter(user=user),
+                              user_tasks(user))
+        self.stdout.write("Rebuilt {0} tasks.".format(Task.objects.count()))
+
+    def check_tasks(self):
+        """Report users whose tasks differ from their tasklist."""
+        mismatches = 0
+        for user in User.objects.all():
+            current = set(user.tasks.values_list(
+                "user_id", "document_id", "reason"))
+            wanted = user_tasks(user)
+            if current != wanted:
+                mismatches += 1
+                self.stdout.write("{0}: missing {1}, stale {2}".format(
+                    user.username,
+                    sorted((d, r) for u, d, r in wanted - current),
+                    sorted((d, r) for u, d, r in current - wanted)))
+        if mismatches:
+            raise CommandError(
+                "The task inbox of {0} users differs from their tasklist."
+                .format(mismatches))
+        self.stdout.write("The task inbox matches the tasklist.")
@@ -13,6 +13,7 @@ import logging
 import json
 from polymorphic import PolymorphicModel, PolymorphicManager
 
+from django.conf import settings
 from django.contrib.auth.models import Group
 from django.db.models import signals
 import django.db.models.options as options
@@ -20,10 +21,10 @@ from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext_lazy as _
 from django.utils.safestring import mark_safe
 from django.core.serializers.json import DjangoJSONEncoder
-from django.db import models
+from django.db import models, transaction
 from django_fsm import FSMField, transition
 
-from pythia.models import Audit, ActiveGeoModelManager
+from pythia.models import Audit, ActiveGeoModelManager, Program, User
 from pythia.fields import PythiaArrayField  # , PythiaTextField
 from pythia.documents.utils import update_document_permissions
 from pythia.reports.models import ARARReport
@@ -1669,3 +1670,162 @@ class StaffTimeEstimate(Audit):
     year3 = models.TextField(
         verbose_name=_("Year 3"), blank=True, null=True,
         help_text=_("The time allocation in year 3 of the project in FTE."))
+
+
+@python_2_unicode_compatible
+class Task(models.Model):
+    """A document requiring the attention of a user.
+
+    The tasks of a user are a materialized ``User.tasklist``, read through
+    ``User.inbox``. They are updated by ``sync_document_tasks`` whenever a
+    document, its project, program or team changes, and by
+    ``sync_user_tasks`` when a user's groups change. The management command
+    ``rebuild_task_inbox`` rebuilds and checks them.
+    """
+
+    REASON_APPROVAL = 'approval'
+    REASON_ENDORSEMENT = 'endorsement'
+    REASON_CHOICES = (
+        (REASON_APPROVAL, _("Approval")),
+        (REASON_ENDORSEMENT, _("Endorsement")),
+    )
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='tasks')
+    document = models.ForeignKey(Document, related_name='tasks')
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+
+    class Meta:
+        """Class options."""
+
+        unique_together = ("user", "document", "reason")
+        verbose_name = _("Task")
+        verbose_name_plural = _("Tasks")
+
+    def __str__(self):
+        """The task."""
+        return "{0} {1} {2}".format(self.user_id, self.reason,
+                                    self.document_id)
+
+
+# Groups endorsing project plans, see User.tasklist
+ENDORSEMENT_GROUPS = (
+    ("BM", "bm_endorsement"),
+    ("HC", "hc_endorsement"),
+    ("AE", "ae_endorsement"),
+)
+
+# Document fields which change the tasks of a document
+TASK_FIELDS = set(["status"] + [f for g, f in ENDORSEMENT_GROUPS])
+
+
+def document_tasks(document):
+    """Return the (user id, document id, reason) tasks of a document.
+
+    This mirrors ``User.tasklist`` for a single document.
+    """
+    from pythia.projects.models import Project, ProjectMembership
+    needed = Document.ENDORSEMENT_REQUIRED
+    project = document.project
+
+    # Project Plans pending endorsement/approval are endorsements only
+    if (isinstance(document, ProjectPlan) and
+            project.status == Project.STATUS_PENDING):
+        groups = [g for g, field in ENDORSEMENT_GROUPS
+                  if getattr(document, field) == needed]
+        if groups:
+            users = User.objects.filter(groups__name__in=groups).values_list(
+                "pk", flat=True).distinct()
+            return set((u, document.pk, Task.REASON_ENDORSEMENT)
+                       for u in users)
+
+    users = set()
+    if document.status == Document.STATUS_INREVIEW and project.program_id:
+        users.add(project.program.program_leader_id)
+    elif document.status == Document.STATUS_NEW:
+        users.update(ProjectMembership.objects.filter(
+            project=project).values_list("user_id", flat=True))
+    elif document.status == Document.STATUS_INAPPROVAL:
+        users.update(User.objects.filter(groups__name="SCD").values_list(
+            "pk", flat=True))
+    return set((u, document.pk, Task.REASON_APPROVAL)
+               for u in users if u is not None)
+
+
+def user_tasks(user):
+    """Return the (user id, document id, reason) tasks of ``User.tasklist``.
+    """
+    tasklist = user.tasklist
+    return set(
+        [(user.pk, d.pk, Task.REASON_APPROVAL)
+         for d in tasklist["approvals"]] +
+        [(user.pk, d.pk, Task.REASON_ENDORSEMENT)
+         for d in tasklist["endorsements"]])
+
+
+def replace_tasks(tasks, wanted):
+    """Replace a queryset of tasks with the wanted tasks.
+
+    Only the difference is written.
+    """
+    current = set(tasks.values_list("user_id", "document_id", "reason"))
+    stale = current - wanted
+    with transaction.atomic():
+        if stale:
+            q = models.Q()
+            for user_id, document_id, reason in stale:
+                q |= models.Q(user_id=user_id, document_id=document_id,
+                              reason=reason)
+            tasks.filter(q).delete()
+        Task.objects.bulk_create([
+            Task(user_id=user_id, document_id=document_id, reason=reason)
+            for user_id, document_id, reason in wanted - current])
+
+
+def sync_document_tasks(documents):
+    """Update the tasks of documents."""
+    for document in documents:
+        replace_tasks(Task.objects.filter(document=document),
+                      document_tasks(document))
+
+
+def sync_user_tasks(users):
+    """Update the tasks of users."""
+    for user in users:
+        replace_tasks(Task.objects.filter(user=user), user_tasks(user))
+
+
+def document_post_save(sender, instance, created, update_fields=None,
+                       **kwargs):
+    """Post-save: update the tasks of a document after a transition."""
+    if not isinstance(instance, Document):
+        return
+    if update_fields and not TASK_FIELDS.intersection(update_fields):
+        return
+    sync_document_tasks([instance])
+
+signals.post_save.connect(document_post_save)
+
+
+def program_post_save(sender, instance, created, **kwargs):
+    """Post-save: update the tasks of a program leader."""
+    if not created:
+        sync_document_tasks(Document.objects.filter(
+            project__program=instance, status=Document.STATUS_INREVIEW))
+
+signals.post_save.connect(program_post_save, sender=Program)
+
+
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Update the tasks of users added to or removed from groups."""
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        users = [instance]
+    elif pk_set:
+        users = User.objects.filter(pk__in=pk_set)
+    else:
+        # group.user_set.clear()
+        users = User.objects.filter(tasks__isnull=False).distinct()
+    sync_user_tasks(users)
+
+signals.m2m_changed.connect(user_groups_changed, sender=User.groups.through)
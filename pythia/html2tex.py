@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""A pure-Python HTML to Latex converter for simple rich text.
+
+Most rich text fields contain simple TinyMCE HTML: paragraphs, bold and
+italic text, lists, links, simple tables, sub- and superscripts.
+``convert()`` converts this subset in-process with the same markup pandoc
+writes, and raises ``Unsupported`` for anything else, which
+``pythia.conversion`` then hands to pandoc.
+"""
+from __future__ import (division, print_function, unicode_literals,
+                        absolute_import)
+import re
+
+from bs4 import BeautifulSoup
+from bs4.element import Comment, NavigableString, Tag
+
+# Latex special characters, also used by the ``texify`` template filter
+REPLACEMENTS = {
+    '&': r'\&',
+    '%': r'\%',
+    '$': r'\$',
+    '#': r'\#',
+    '_': r'\_',
+    '<': r'\textless{}',
+    '>': r'\textgreater',
+    '{': r'\{',
+    '}': r'\}',
+    u'°': r'\textdegree',
+    '~': r'\textasciitilde{}',
+    '^': r'\textasciicircum',
+    '\n': r'\newline ',
+    '\r': r'',
+    }
+
+# The same replacements for HTML text, applied in a single pass.
+# Newlines are whitespace in HTML, and commands are terminated with "{}"
+# so that they do not swallow following letters.
+TEXT_REPLACEMENTS = dict(
+    (k, v + "{}" if re.search(r"\\[a-z]+$", v) else v)
+    for k, v in REPLACEMENTS.items() if k not in ('\n', '\r'))
+TEXT_REPLACEMENTS.update({
+    '\\': r'\textbackslash{}',
+    '[': '{[}',
+    ']': '{]}',
+    '|': r'\textbar{}',
+    '\xa0': '~',
+    })
+TEXT_RE = re.compile("|".join(re.escape(k) for k in TEXT_REPLACEMENTS))
+URL_RE = re.compile(r"[%#\\{}]")
+WHITESPACE_RE = re.compile(r"[ \t\r\n\f]+")
+
+INLINE_COMMANDS = {
+    "b": "textbf",
+    "strong": "textbf",
+    "i": "emph",
+    "em": "emph",
+    "sub": "textsubscript",
+    "sup": "textsuperscript",
+    }
+INLINE_TAGS = set(INLINE_COMMANDS) | set(["span", "a", "br"])
+BLOCK_TAGS = set(["p", "div", "ul", "ol", "blockquote", "table"])
+
+
+class Unsupported(Exception):
+    """The HTML contains markup the native converter does not handle."""
+
+    pass
+
+
+def escape(text):
+    """Escape Latex special characters in HTML text."""
+    text = TEXT_RE.sub(lambda m: TEXT_REPLACEMENTS[m.group(0)], text)
+    # Prevent "--" and "---" from becoming dashes
+    return re.sub(r"-(?=-)", "-{}", text)
+
+
+def is_text(node):
+    """Whether a node is plain text, not a comment, doctype or CDATA."""
+    return type(node) is NavigableString
+
+
+def is_inline(node):
+    """Whether a node is text or an inline tag."""
+    return is_text(node) or (
+        isinstance(node, Tag) and node.name in INLINE_TAGS)
+
+
+def children(node):
+    """Return the child nodes of a tag without comments."""
+    for child in node.children:
+        if isinstance(child, Comment):
+            continue
+        if not (is_text(child) or isinstance(child, Tag)):
+            raise Unsupported(type(child).__name__)
+        yield child
+
+
+def wrap(command, content):
+    """Wrap inline content in a command, keeping edge spaces outside."""
+    if not content.strip(" "):
+        return content
+    return "{0}\\{1}{{{2}}}{3}".format(
+        " " if content.startswith(" ") else "",
+        command,
+        content.strip(" "),
+        " " if content.endswith(" ") else "")
+
+
+def inline(node):
+    """Return the Latex for an inline node."""
+    if is_text(node):
+        return escape(WHITESPACE_RE.sub(" ", node))
+    if node.name not in INLINE_TAGS:
+        raise Unsupported(node.name)
+
+    if node.name == "br":
+        return "\\\\\n"
+
+    content = "".join(inline(child) for child in children(node))
+
+    if node.name in INLINE_COMMANDS:
+        return wrap(INLINE_COMMANDS[node.name], content)
+
+    if node.name == "span":
+        if node.attrs:
+            raise Unsupported("span with attributes")
+        return content
+
+    # node.name == "a"
+    href = node.get("href", "")
+    if not re.match(r"https?://", href):
+        raise Unsupported("link to {0}".format(href))
+    url = URL_RE.sub(lambda m: "\\" + m.group(0), href)
+    if node.get_text() == href:
+        return "\\url{{{0}}}".format(url)
+    return wrap("href{{{0}}}".format(url), content)
+
+
+def paragraph(nodes):
+    """Return the Latex for a run of inline nodes."""
+    content = "".join(inline(node) for node in nodes)
+    return re.sub(r" *\n *", "\n", re.sub(r" +", " ", content)).strip(" \n")
+
+
+def blocks(node):
+    """Return the Latex paragraphs for the children of a block container.
+
+    Runs of inline nodes between block tags become paragraphs.
+    """
+    result = []
+    run = []
+    for child in children(node):
+        if is_inline(child):
+            run.append(child)
+            continue
+        result.append(paragraph(run))
+        run = []
+        result.append(block(child))
+    result.append(paragraph(run))
+    return [b for b in result if b]
+
+
+def block(node):
+    """Return the Latex for a block tag."""
+    if node.name not in BLOCK_TAGS:
+        raise Unsupported(node.name)
+
+    if node.name == "p":
+        return paragraph(children(node))
+
+    if node.name == "div":
+        return "\n\n".join(blocks(node))
+
+    if node.name == "blockquote":
+        return "\\begin{{quote}}\n{0}\n\\end{{quote}}".format(
+            "\n\n".join(blocks(node)))
+
+    if node.name in ("ul", "ol"):
+        return listing(node)
+
+    return table(node)
+
+
+def listing(node):
+    """Return the Latex for an ordered or unordered list."""
+    if node.attrs:
+        raise Unsupported("list with attributes")
+    if node.name == "ol" and node.find_parent("li"):
+        raise Unsupported("nested ordered list")
+
+    items = []
+    tight = True
+    for child in children(node):
+        if is_text(child) and not child.strip():
+            continue
+        if not isinstance(child, Tag) or child.name != "li":
+            raise Unsupported("list content")
+        if child.find("p", recursive=False):
+            tight = False
+        content = "\n\n".join(blocks(child)).replace("\n", "\n  ")
+        items.append("\\item\n  " + content if content else "\\item")
+
+    if not items:
+        return ""
+    environment = "itemize" if node.name == "ul" else "enumerate"
+    lines = ["\\begin{{{0}}}".format(environment)]
+    if environment == "enumerate":
+        lines.append("\\def\\labelenumi{\\arabic{enumi}.}")
+    if tight:
+        lines.append("\\tightlist")
+    lines += items
+    lines.append("\\end{{{0}}}".format(environment))
+    return "\n".join(lines)
+
+
+def table(node):
+    """Return the Latex for a simple table without merged cells."""
+    header = None
+    rows = []
+    for row in node.find_all("tr"):
+        if row.find_parent("table") is not node:
+            raise Unsupported("nested table")
+        cells = row.find_all(["td", "th"], recursive=False)
+        if any(c.get("colspan", "1") != "1" or c.get("rowspan", "1") != "1"
+               for c in cells):
+            raise Unsupported("merged table cells")
+        latex = [paragraph(children(c)) for c in cells]
+        if (header is None and not rows and cells and
+                (row.parent.name == "thead" or
+                 all(c.name == "th" for c in cells))):
+            header = latex
+        else:
+            rows.append(latex)
+    if node.find(["caption", "colgroup", "col", "tfoot"]):
+        raise Unsupported("table parts")
+
+    columns = max([len(r) for r in rows + [header or []]] or [0])
+    if not columns:
+        return ""
+
+    def line(cells):
+        cells = cells + [""] * (columns - len(cells))
+        return " & ".join(cells) + "\\tabularnewline"
+
+    lines = ["\\begin{{longtable}}[]{{@{{}}{0}@{{}}}}".format("l" * columns),
+             "\\toprule"]
+    if header is not None:
+        lines += [line(header), "\\midrule"]
+    lines.append("\\endhead")
+    lines += [line(r) for r in rows]
+    lines += ["\\bottomrule", "\\end{longtable}"]
+    return "\n".join(lines)
+
+
+def convert(value):
+    """Convert an HTML string to Latex or raise ``Unsupported``."""
+    soup = BeautifulSoup(value, "html.parser")
+    result = "\n\n".join(blocks(soup))
+    return result + "\n" if result else ""
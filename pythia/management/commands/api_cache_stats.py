@@ -0,0 +1,33 @@
+"""Report the hit ratios of the cached API lists."""
+from __future__ import (division, print_function, unicode_literals,
+                        absolute_import)
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from pythia import apicache
+from pythia.api import CachedListMixin, router
+
+
+class Command(BaseCommand):
+    """Report hits, misses and hit ratio of each cached API list."""
+
+    help = "Report the hit ratios of the cached API lists."
+    option_list = BaseCommand.option_list + (
+        make_option(
+            "--reset", action="store_true", dest="reset", default=False,
+            help="Reset the counters after reporting."),
+    )
+
+    def handle(self, *args, **options):
+        """Report and optionally reset the counters."""
+        names = [viewset.__name__ for prefix, viewset, base_name
+                 in router.registry if issubclass(viewset, CachedListMixin)]
+        for name, counts in sorted(apicache.stats(names).items()):
+            ratio = counts["hit_ratio"]
+            self.stdout.write(
+                "{0}: {1} hits, {2} misses, hit ratio {3}.".format(
+                    name, counts["hits"], counts["misses"],
+                    "-" if ratio is None else "{0:.1%}".format(ratio)))
+        if options["reset"]:
+            apicache.reset_stats(names)
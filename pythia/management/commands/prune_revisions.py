@@ -0,0 +1,89 @@
+"""Delete revisions recorded by saves that did not change anything."""
+from __future__ import (division, print_function, unicode_literals,
+                        absolute_import)
+import json
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reversion.models import Revision, Version
+
+NOTHING_CHANGED = "Nothing changed."
+
+# Fields every save changes
+IGNORED_FIELDS = ("modified", "modifier")
+
+
+def version_data(version):
+    """Return the serialized data of a version without audit fields."""
+    if version.format != "json":
+        return version.serialized_data
+    try:
+        data = json.loads(version.serialized_data)
+    except ValueError:
+        return version.serialized_data
+    for obj in data:
+        for field in IGNORED_FIELDS:
+            obj.get("fields", {}).pop(field, None)
+    return data
+
+
+def is_unchanged(version):
+    """Whether a version equals the previous version of its object."""
+    previous = Version.objects.filter(
+        content_type_id=version.content_type_id,
+        object_id=version.object_id,
+        revision_id__lt=version.revision_id).order_by("-revision_id").first()
+    return (previous is not None and
+            version_data(previous) == version_data(version))
+
+
+class Command(BaseCommand):
+    """Delete "Nothing changed." revisions without changes.
+
+    The comment of a "Nothing changed." save replaced the comment of any
+    revision it was nested in, e.g. an admin change, so a revision is only
+    deleted if it has no versions or all of its versions equal the previous
+    versions of their objects.
+    """
+
+    help = "Delete \"Nothing changed.\" revisions without changes."
+    option_list = BaseCommand.option_list + (
+        make_option(
+            "--dry-run", action="store_true", dest="dry_run", default=False,
+            help="Only count the revisions that would be deleted."),
+        make_option(
+            "--batch-size", type="int", dest="batch_size", default=500,
+            help="Number of revisions to check per transaction."),
+    )
+
+    def handle(self, *args, **options):
+        """Check the revisions in batches and report the counts."""
+        revisions = Revision.objects.filter(
+            comment=NOTHING_CHANGED).order_by("pk")
+        last = 0
+        checked = deleted = 0
+        while True:
+            batch = list(revisions.filter(pk__gt=last).values_list(
+                "pk", flat=True)[:options["batch_size"]])
+            if not batch:
+                break
+            last = batch[-1]
+
+            versions = {}
+            for version in Version.objects.filter(revision__in=batch):
+                versions.setdefault(version.revision_id, []).append(version)
+            prune = [pk for pk in batch
+                     if all(is_unchanged(v) for v in versions.get(pk, []))]
+
+            checked += len(batch)
+            deleted += len(prune)
+            if prune and not options["dry_run"]:
+                with transaction.atomic():
+                    Version.objects.filter(revision__in=prune).delete()
+                    Revision.objects.filter(pk__in=prune).delete()
+
+        self.stdout.write("{0} {1} of {2} \"{3}\" revisions.".format(
+            "Would delete" if options["dry_run"] else "Deleted",
+            deleted, checked, NOTHING_CHANGED))
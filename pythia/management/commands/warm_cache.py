@@ -0,0 +1,72 @@
+"""Check the shared caches and fill them with the common API lists."""
+from __future__ import (division, print_function, unicode_literals,
+                        absolute_import)
+from optparse import make_option
+import time
+from urlparse import urlparse
+
+from django.conf import settings
+from django.core.cache import get_cache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.urlresolvers import resolve
+
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from pythia.middleware import get_first_user
+
+# The lists most requested by the public website and map clients
+PATHS = (
+    "/api/projects/?format=json",
+    "/api/programs/?format=json",
+    "/api/programs/?format=json&published=True",
+    "/api/divisions/?format=json",
+    "/api/areas/?format=json",
+)
+
+
+class Command(BaseCommand):
+    """Check the shared caches and fill them with the common API lists.
+
+    Run this at deploy, as a new release starts with empty cache keys.
+    The lists are cached per host, which is taken from ``SITE_URL``.
+    """
+
+    help = "Check the shared caches and fill them with the common API lists."
+    option_list = BaseCommand.option_list + (
+        make_option(
+            "--path", action="append", dest="paths", default=[],
+            help="Also request this API list, e.g. /api/areas/?area_type=4"),
+        make_option(
+            "--site-url", dest="site_url",
+            default=getattr(settings, "SITE_URL", None),
+            help="The URL the site is served at, default: SITE_URL."),
+    )
+
+    def handle(self, *args, **options):
+        """Check the caches, then request each list."""
+        for alias, config in sorted(settings.CACHES.items()):
+            cache = get_cache(alias)
+            cache.set("warm_cache", "ok", 60)
+            if cache.get("warm_cache") != "ok":
+                raise CommandError("The cache {0} ({1}) does not work.".format(
+                    alias, config["BACKEND"]))
+            self.stdout.write(
+                "Cache {0} ({1}) with key prefix {2} works.".format(
+                    alias, config["BACKEND"], config.get("KEY_PREFIX", "")))
+
+        site = urlparse(options["site_url"] or "http://localhost")
+        extra = {
+            "HTTP_HOST": site.netloc or site.path,
+            "wsgi.url_scheme": site.scheme or "http",
+        }
+        user = get_first_user()
+        for path in PATHS + tuple(options["paths"]):
+            request = APIRequestFactory().get(path, **extra)
+            force_authenticate(request, user=user)
+            match = resolve(urlparse(path).path)
+            start = time.time()
+            response = match.func(request, *match.args, **match.kwargs)
+            if hasattr(response, "render"):
+                response.render()
+            self.stdout.write("{0}: status {1} in {2:.2f} s.".format(
+                path, response.status_code, time.time() - start))
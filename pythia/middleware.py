@@ -10,9 +10,12 @@ from django.conf import settings
 from django.contrib.auth import login, logout, get_user_model, authenticate
 from django.db.models import signals
 from django.utils.functional import curry
+from contextlib import contextmanager
 import logging
-from threading import local
+from threading import local, Lock
 _thread_locals = local()
+_system_user = None
+_system_user_lock = Lock()
 logger = logging.getLogger(__name__)
 
 def get_first_user():
@@ -21,9 +24,60 @@ def get_first_user():
     return User.objects.first()
 
 
+def get_system_user():
+    """Return the superuser, looked up once per process."""
+    global _system_user
+    if _system_user is None:
+        with _system_user_lock:
+            if _system_user is None:
+                _system_user = get_first_user()
+    return _system_user
+
+
+def reset_system_user():
+    """Forget the superuser, e.g. after tests roll back the users."""
+    global _system_user
+    with _system_user_lock:
+        _system_user = None
+
+
+def system_user_changed(sender, instance, **kwargs):
+    """Forget the superuser when it is saved or deleted."""
+    user = _system_user
+    if user is not None and user.pk == instance.pk:
+        reset_system_user()
+
+
 def get_current_user():
-    """Return the current request user or the superuser."""
-    return getattr(_thread_locals, 'user', get_first_user())
+    """Return the current request user or the superuser.
+
+    The superuser is looked up once per process, see ``get_system_user``.
+    """
+    user = getattr(_thread_locals, 'user', None)
+    if user is None:
+        return get_system_user()
+    return user
+
+
+@contextmanager
+def current_user(user=None):
+    """Set the user returned by ``get_current_user`` within a block.
+
+    Without a user, the request user is kept, or the superuser is used.
+    """
+    previous = getattr(_thread_locals, 'user', None)
+    if user is None:
+        user = get_system_user() if previous is None else previous
+    _thread_locals.user = user
+    try:
+        yield user
+    finally:
+        _thread_locals.user = previous
+
+
+def system_user():
+    """Run a block as the superuser, even within a request."""
+    return current_user(get_system_user())
 
 
 class ThreadLocals(object):
@@ -41,10 +95,53 @@ class ThreadLocals(object):
         if request_user and not user_is_anon:
             user = request_user
         else:
-            user = get_first_user()
+            user = get_system_user()
         _thread_locals.user = user
 
 
+class DeferredCacheRefresh(object):
+    """Middleware refreshing the caches of projects changed by a request.
+
+    Each project is refreshed once after the view, see
+    ``pythia.projects.models.deferred_cache_refresh``.
+    """
+
+    def process_request(self, request):
+        """Start collecting project cache refreshes."""
+        from pythia.projects.models import defer_cache_refresh
+        defer_cache_refresh()
+
+    def process_response(self, request, response):
+        """Run the collected project cache refreshes."""
+        from pythia.projects.models import flush_cache_refresh
+        flush_cache_refresh()
+        return response
+
+
+class DeferredJobs(object):
+    """Middleware enqueueing background jobs after a request's transactions.
+
+    See ``pythia.tasks.enqueue_on_commit``. Jobs of failed requests are
+    dropped.
+    """
+
+    def process_request(self, request):
+        """Start collecting background jobs."""
+        from pythia.tasks import defer_jobs
+        defer_jobs()
+
+    def process_exception(self, request, exception):
+        """Drop the collected background jobs."""
+        from pythia.tasks import flush_jobs
+        flush_jobs(run=False)
+
+    def process_response(self, request, response):
+        """Enqueue the collected background jobs."""
+        from pythia.tasks import flush_jobs
+        flush_jobs()
+        return response
+
+
 class SSOLoginMiddleware(object):
 
     def process_request(self, request):
@@ -1,15 +1,20 @@
 """Top level models for pythia."""
 from __future__ import (division, print_function, unicode_literals,
                         absolute_import)
+from contextlib import contextmanager
 import copy
+from datetime import timedelta
 import logging
 import reversion
+import threading
 
 from django.conf import settings
 from django.core import validators
 from django.core.mail import send_mail
 from django.core.exceptions import ValidationError, ImproperlyConfigured
 from django.core.urlresolvers import reverse
+from django.contrib.contenttypes.generic import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth.models import (AbstractBaseUser, PermissionsMixin,
                                         BaseUserManager, Group)
 from django.contrib.gis.db import models as geo_models
@@ -28,7 +33,8 @@ from django.utils.html import strip_tags
 from django.utils.safestring import mark_safe
 from django.utils.text import slugify
 from django.utils.translation import ugettext_lazy as _
-from pythia.middleware import get_current_user
+from pythia import apicache
+from pythia.middleware import get_current_user, system_user_changed
 from pythia.utils import texify_filename
 from django_resized import ResizedImageField
 
@@ -38,6 +44,14 @@ from django_resized import ResizedImageField
 logger = logging.getLogger(__name__)
 
 
+def pdfbuilds_upload_to(instance, filename):
+    """Create an upload location for PDFs of objects without a PDF field."""
+    return "pdfbuilds/{0}/{1}".format(
+        instance.pk,
+        texify_filename(filename)
+    )
+
+
 def programs_upload_to(instance, filename):
     """Create a custom upload location for user-submitted program files."""
     return "programs/{0}/{1}".format(
@@ -256,6 +270,34 @@ class ActiveGeoModel(ActiveModel):
         abstract = True
 
 
+_revisions = threading.local()
+
+
+@contextmanager
+def no_revisions():
+    """Save ``Audit`` objects within a block without creating revisions.
+
+    Use this for bulk jobs and maintenance.
+    """
+    previous = getattr(_revisions, "disabled", False)
+    _revisions.disabled = True
+    try:
+        yield
+    finally:
+        _revisions.disabled = previous
+
+
+_field_attnames = {}
+
+
+def field_attnames(model):
+    """Return the set of field attribute names of a model class."""
+    if model not in _field_attnames:
+        _field_attnames[model] = frozenset(
+            f.attname for f in model._meta.fields)
+    return _field_attnames[model]
+
+
 @python_2_unicode_compatible
 class Audit(geo_models.Model):
     """Abstract Audit base class."""
@@ -276,14 +318,28 @@ class Audit(geo_models.Model):
     created = models.DateTimeField(default=timezone.now, editable=False)
     modified = models.DateTimeField(auto_now=True, editable=False)
 
+    # Fields caching derived data, saving only these creates no revision
+    cache_fields = ()
+
     def __init__(self, *args, **kwargs):
-        """Init."""
+        """Init.
+
+        Loaded objects track changes: the loaded value of a field is kept in
+        ``_initial`` when the field is first assigned, see ``__setattr__``.
+        """
         super(Audit, self).__init__(*args, **kwargs)
         self._changed_data = None
         self._initial = {}
-        if self.pk:
-            for field in self._meta.fields:
-                self._initial[field.attname] = getattr(self, field.attname)
+        self._track_changes = bool(self.pk)
+
+    def __setattr__(self, name, value):
+        """Keep the loaded value of a field on its first assignment."""
+        if self.__dict__.get("_track_changes"):
+            initial = self._initial
+            if (name not in initial and name in self.__dict__ and
+                    name in field_attnames(type(self))):
+                initial[name] = self.__dict__[name]
+        super(Audit, self).__setattr__(name, value)
 
     def has_changed(self):
         """Return true if the current data differs from initial."""
@@ -307,6 +363,11 @@ class Audit(geo_models.Model):
         the request.user from thread local storage (as injected by
         pythia.middleware.ThreadLocals) or the superuser in case the thread
         was not a request (e.g. run through shell or unit tests).
+        Bulk saves outside of requests should run within
+        pythia.middleware.current_user, which looks the superuser up once.
+
+        Saves without changes, saves of ``cache_fields`` only and saves
+        within ``no_revisions`` create no revision.
         """
         user = get_current_user()
 
@@ -320,17 +381,19 @@ class Audit(geo_models.Model):
         self.modifier = user
         super(Audit, self).save(*args, **kwargs)
 
+        update_fields = kwargs.get("update_fields")
+        if getattr(_revisions, "disabled", False) or (
+                update_fields is not None and
+                set(update_fields) <= set(self.cache_fields)):
+            return
+
         if created:
             with reversion.create_revision():
                 reversion.set_comment('Initial version.')
-        else:
-            if self.has_changed():
-                comment = 'Changed ' + ', '.join(self.changed_data) + '.'
-                with reversion.create_revision():
-                    reversion.set_comment(comment)
-            else:
-                with reversion.create_revision():
-                    reversion.set_comment('Nothing changed.')
+        elif self.has_changed():
+            comment = 'Changed ' + ', '.join(self.changed_data) + '.'
+            with reversion.create_revision():
+                reversion.set_comment(comment)
 
     def __str__(self):
         """String representation."""
@@ -1345,73 +1408,72 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     @property
     def tasklist(self):
-        """Return documents which require input from the current user."""
-        from pythia.projects.models import Project, ProjectMembership
-        from pythia.documents.models import Document, ProjectPlan
+        """Return documents which require input from the current user.
 
-        groups = [g.name for g in self.groups.all()]
-        is_bm = u'BM' in groups
-        is_hc = u'HC' in groups
-        is_ae = u'AE' in groups
-        is_scd = u'SCD' in groups
+        The documents are fetched in a constant number of queries, whatever
+        the number of programs, projects and memberships of the user.
+        """
+        from pythia.projects.models import Project
+        from pythia.documents.models import Document, ProjectPlan
 
-        excludes = set()
-        # Project Plans pending endorsement/approval
-        pplan_list = ProjectPlan.objects.filter(
-            project__status=Project.STATUS_PENDING)
-        for doc in pplan_list:
-            if ((doc.bm_endorsement == Document.ENDORSEMENT_REQUIRED) or (
-                    doc.hc_endorsement == Document.ENDORSEMENT_REQUIRED) or (
-                    doc.ae_endorsement == Document.ENDORSEMENT_REQUIRED)):
-                excludes.add(doc)
-
-        endorsements = set()
+        groups = set(self.groups.values_list("name", flat=True))
         needed = Document.ENDORSEMENT_REQUIRED
 
-        if is_bm:
-            logger.debug(type(pplan_list))
-            endorsements.update(pplan_list.filter(
-                bm_endorsement=needed).select_related('project'))
-
-        if is_hc:
-            endorsements.update(pplan_list.filter(
-                hc_endorsement=needed).select_related('project'))
-
-        if is_ae:
-            endorsements.update(pplan_list.filter(
-                ae_endorsement=needed).select_related('project'))
-
-        approvals = set()
-
-        # documents in review need PL attention
-        program_list = self.leads_programs.all()
-        # program -> projects is a reverse foreign key lookup,
-        # we can't batch this, so do one query per program
-        for prog in program_list:
-            projects = prog.project_set.prefetch_related('documents')
-            for proj in projects:
-                approvals.update(proj.documents.filter(
-                    status=Document.STATUS_INREVIEW).select_related('project'))
-
-        member_list = ProjectMembership.objects.prefetch_related(
-            'project', 'project__documents').filter(user=self)
-
-        for member in member_list:
-            approvals.update(member.project.documents.filter(
-                status=Document.STATUS_NEW).select_related('project'))
+        # Project Plans pending endorsement/approval
+        pending = ProjectPlan.objects.filter(
+            project__status=Project.STATUS_PENDING).filter(
+            models.Q(bm_endorsement=needed) |
+            models.Q(hc_endorsement=needed) |
+            models.Q(ae_endorsement=needed))
+
+        endorsement = models.Q()
+        for group, field in (("BM", "bm_endorsement"),
+                             ("HC", "hc_endorsement"),
+                             ("AE", "ae_endorsement")):
+            if group in groups:
+                endorsement |= models.Q(**{field: needed})
+        endorsements = list(pending.filter(endorsement).select_related(
+            "project")) if endorsement else []
+
+        # documents in review need PL attention,
+        # new documents need team attention
+        approval = (
+            models.Q(status=Document.STATUS_INREVIEW,
+                     project__program__program_leader=self) |
+            models.Q(status=Document.STATUS_NEW,
+                     project__projectmembership__user=self))
 
         # documents in approval need SCD attention
-        if is_scd:
-            documents = Document.objects.filter(
-                status=Document.STATUS_INAPPROVAL).select_related('project')
-            approvals.update(documents)
+        if "SCD" in groups:
+            approval |= models.Q(status=Document.STATUS_INAPPROVAL)
 
         #  deduplicate approvals pool with endorsements
-        approvals.difference_update(excludes)
+        approvals = list(Document.objects.filter(approval).exclude(
+            pk__in=pending.values("pk")).select_related("project").distinct())
 
         # TODO: presort the output lists by descending project ID
-        return {'approvals': list(approvals),
-                'endorsements': list(endorsements),
+        return {'approvals': approvals,
+                'endorsements': endorsements,
+                'count': len(approvals) + len(endorsements)}
+
+    @property
+    def inbox(self):
+        """Return the tasklist from the materialized task inbox.
+
+        The result equals ``tasklist``, read from ``documents.Task`` rows
+        maintained by document, project and group changes.
+        """
+        from pythia.documents.models import Document, Task
+
+        tasks = dict(self.tasks.values_list("document_id", "reason"))
+        documents = list(Document.objects.filter(
+            pk__in=list(tasks)).select_related("project"))
+        approvals = [d for d in documents
+                     if tasks[d.pk] == Task.REASON_APPROVAL]
+        endorsements = [d for d in documents
+                        if tasks[d.pk] == Task.REASON_ENDORSEMENT]
+        return {'approvals': approvals,
+                'endorsements': endorsements,
                 'count': len(approvals) + len(endorsements)}
 
     @property
@@ -1423,48 +1485,48 @@ class User(AbstractBaseUser, PermissionsMixin):
         If it's just for index.html (a template) consider making it a template
         tag!
         """
-        from pythia.projects.models import (
-            Project, ProjectMembership,
-            # ScienceProject, CoreFunctionProject,
-            # CollaborationProject, StudentProject
-        )
+        from pythia.projects.models import Project, ProjectMembership
         from pythia.documents.models import (ConceptPlan, ProjectPlan)
         from datetime import datetime, timedelta
 
-        groups = [g.name for g in self.groups.all()]
+        groups = set(self.groups.values_list("name", flat=True))
         is_scd = u'SCD' in groups
 
-        # Fun fact: Django polymorphism casts the returned items from a
-        # Project.objects query into the highest subclass, but does not
-        # rig it for private key lookups. This is why we need to hit the
-        # database again with pm_list to fetch the correctly casted object.
-
-        best_before = datetime.now() - timedelta(days=60)
-        pm_list = ProjectMembership.objects.select_related("project").order_by(
+        # Projects are fetched once through Project.objects, which casts them
+        # into their subclass with one query per project type.
+        pm_list = list(ProjectMembership.objects.order_by(
             "-project__year", "-project__number").filter(
-            user=self, project__status__in=Project.ACTIVE)
-        projects = Project.objects.order_by("-year", "-number").filter(
-            effective_to__isnull=True,
-            project_owner=self)
-        own_list = projects.filter(status__in=Project.ACTIVE)
-        stuck_new = projects.filter(status__in=Project.STATUS_NEW,
-                                    created__lt=best_before)
-        stuck_pending = projects.filter(status__in=Project.STATUS_PENDING,
-                                        created__lt=best_before)
+            user=self, project__status__in=Project.ACTIVE).values_list(
+            "project_id", "role"))
+        projects = list(Project.objects.order_by("-year", "-number").filter(
+            models.Q(pk__in=[pk for pk, role in pm_list]) |
+            models.Q(effective_to__isnull=True, project_owner=self,
+                     status__in=Project.ACTIVE)))
+        project_dict = dict((p.pk, p) for p in projects)
+        own_list = [p for p in projects if p.project_owner_id == self.pk and
+                    p.effective_to is None and p.status in Project.ACTIVE]
+
         result = {"projects": {}, "collabs": {}, "stuck": {}}
         proj_result = {"super": [], "regular": []}
         collab_result = {"super": [], "regular": []}
         stuck_result = {"new": [], "pending": []}
 
-        for x in stuck_new:
-            # Projects stuck in approval for more than three months need a
-            # kick up the rear end
-            doc = x.documents.instance_of(ConceptPlan).get()
-            stuck_result["new"].append(doc)
-
-        for x in stuck_pending:
-            doc = x.documents.instance_of(ProjectPlan).get()
-            stuck_result["pending"].append(doc)
+        # Projects stuck in approval for more than three months need a
+        # kick up the rear end. Only SCD sees them, see below.
+        if is_scd and self.show_docs:
+            best_before = datetime.now() - timedelta(days=60)
+            stuck = dict(
+                project__effective_to__isnull=True,
+                project__project_owner=self,
+                project__created__lt=best_before)
+            stuck_result["new"] = list(ConceptPlan.objects.filter(
+                project__status=Project.STATUS_NEW, **stuck).order_by(
+                "-project__year", "-project__number").select_related(
+                "project"))
+            stuck_result["pending"] = list(ProjectPlan.objects.filter(
+                project__status=Project.STATUS_PENDING, **stuck).order_by(
+                "-project__year", "-project__number").select_related(
+                "project"))
 
         for x in own_list:
             if x.type in (
@@ -1474,40 +1536,27 @@ class User(AbstractBaseUser, PermissionsMixin):
                     Project.COLLABORATION_PROJECT, Project.STUDENT_PROJECT):
                 collab_result["super"].append(x)
 
-        for x in pm_list:
-            res = None
-            proj = None
-
-            try:
-                if x.project.type == Project.SCIENCE_PROJECT:
-                    res = proj_result
-                    # proj = ScienceProject.objects.get(pk=x.project.pk)
-                    proj = Project.objects.get(pk=x.project.pk)
-                elif x.project.type == Project.CORE_PROJECT:
-                    res = proj_result
-                    # proj = CoreFunctionProject.objects.get(pk=x.project.pk)
-                    proj = Project.objects.get(pk=x.project.pk)
-                elif x.project.type == Project.COLLABORATION_PROJECT:
-                    res = collab_result
-                    # proj = CollaborationProject.objects.get(pk=x.project.pk)
-                    proj = Project.objects.get(pk=x.project.pk)
-                elif x.project.type == Project.STUDENT_PROJECT:
-                    res = collab_result
-                    # proj = StudentProject.objects.get(pk=x.project.pk)
-                    proj = Project.objects.get(pk=x.project.pk)
-                else:
-                    continue
+        for pk, role in pm_list:
+            proj = project_dict.get(pk)
+            if proj is None:
+                logger.warning("Project lookup for User portfolio"
+                               " failed: {0}".format(pk))
+                continue
 
-                if not (proj in res["super"]):
-                    if x.role in [ProjectMembership.ROLE_SUPERVISING_SCIENTIST,
-                                  ProjectMembership.ROLE_ACADEMIC_SUPERVISOR]:
-                        res["super"].append(proj)
-                    else:
-                        res["regular"].append(proj)
+            if proj.type in (Project.SCIENCE_PROJECT, Project.CORE_PROJECT):
+                res = proj_result
+            elif proj.type in (Project.COLLABORATION_PROJECT,
+                               Project.STUDENT_PROJECT):
+                res = collab_result
+            else:
+                continue
 
-            except:
-                logger.warning("Project lookup for User portfolio"
-                               " failed: " + str(x))
+            if not (proj in res["super"]):
+                if role in [ProjectMembership.ROLE_SUPERVISING_SCIENTIST,
+                            ProjectMembership.ROLE_ACADEMIC_SUPERVISOR]:
+                    res["super"].append(proj)
+                else:
+                    res["regular"].append(proj)
 
         if proj_result["super"] or proj_result["regular"]:
             result["projects"] = proj_result
@@ -1539,4 +1588,124 @@ class User(AbstractBaseUser, PermissionsMixin):
     @property
     def is_admin(self):
         """Return True if the User is in Group "admins"."""
-        return 'admins' in [g.name for g in self.groups.all()]
\ No newline at end of file
+        return 'admins' in [g.name for g in self.groups.all()]
+
+
+@python_2_unicode_compatible
+class PDFBuild(models.Model):
+    """A PDF export of an object, built in the background.
+
+    See ``pythia.pdf`` and ``pythia.tasks``.
+    """
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = (
+        (STATUS_QUEUED, _("Queued")),
+        (STATUS_RUNNING, _("Running")),
+        (STATUS_DONE, _("Done")),
+        (STATUS_FAILED, _("Failed")),
+    )
+    PENDING = (STATUS_QUEUED, STATUS_RUNNING)
+
+    content_type = models.ForeignKey(ContentType)
+    object_id = models.PositiveIntegerField()
+    content_object = GenericForeignKey()
+
+    template = models.CharField(
+        max_length=200,
+        help_text=_("The Latex template, e.g. arar for latex/arar.tex."))
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED,
+        db_index=True)
+    baseurl = models.CharField(max_length=2000, blank=True)
+    embed = models.BooleanField(default=True)
+    headers = models.BooleanField(default=True)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, related_name="pdf_builds",
+        blank=True, null=True)
+    created = models.DateTimeField(default=timezone.now, editable=False)
+    started = models.DateTimeField(blank=True, null=True, editable=False)
+    finished = models.DateTimeField(blank=True, null=True, editable=False)
+    log = models.TextField(blank=True, editable=False)
+    pdf = models.FileField(
+        upload_to=pdfbuilds_upload_to, blank=True, null=True, editable=False,
+        help_text=_("The PDF of objects without a PDF field."))
+
+    class Meta:
+        """Class opts."""
+
+        app_label = 'pythia'
+        ordering = ['-created']
+        get_latest_by = 'created'
+        verbose_name = _("PDF build")
+        verbose_name_plural = _("PDF builds")
+
+    def __str__(self):
+        """String representation."""
+        return "PDF build {0} of {1} {2} ({3})".format(
+            self.pk, self.content_type, self.object_id, self.status)
+
+    @property
+    def is_pending(self):
+        """Whether the build is queued or running."""
+        return self.status in self.PENDING
+
+    @property
+    def pdf_url(self):
+        """The URL of the built PDF, or None."""
+        if self.status != self.STATUS_DONE:
+            return None
+        if self.pdf:
+            return self.pdf.url
+        pdf = getattr(self.content_object, "pdf", None)
+        return pdf.url if pdf else None
+
+    def as_dict(self):
+        """Return the build status as dict."""
+        return {
+            "id": self.pk,
+            "status": self.status,
+            "created": self.created.isoformat(),
+            "started": self.started.isoformat() if self.started else None,
+            "finished": self.finished.isoformat() if self.finished else None,
+            "pdf": self.pdf_url,
+        }
+
+    @classmethod
+    def request(cls, obj, template, user=None, **kwargs):
+        """Return a pending build of ``obj`` or a new one.
+
+        Builds pending for longer than ``settings.PDF_BUILD_TIMEOUT`` seconds
+        are considered lost, e.g. to a restarted worker.
+        """
+        content_type = ContentType.objects.get_for_model(obj)
+        timeout = getattr(settings, "PDF_BUILD_TIMEOUT", 3600)
+        pending = cls.objects.filter(
+            content_type=content_type,
+            object_id=obj.pk,
+            template=template,
+            status__in=cls.PENDING,
+            created__gte=timezone.now() - timedelta(seconds=timeout))
+        if pending.exists():
+            return pending.latest(), False
+        return cls.objects.create(
+            content_type=content_type, object_id=obj.pk, template=template,
+            requested_by=user, **kwargs), True
+
+
+# Saved, deleted and related models invalidate the API lists showing them
+signals.post_save.connect(
+    apicache.model_changed, dispatch_uid="apicache_post_save")
+signals.post_delete.connect(
+    apicache.model_changed, dispatch_uid="apicache_post_delete")
+signals.m2m_changed.connect(
+    apicache.relation_changed, dispatch_uid="apicache_m2m_changed")
+
+# The cached superuser is looked up again after it changed
+signals.post_save.connect(
+    system_user_changed, sender=User, dispatch_uid="system_user_post_save")
+signals.post_delete.connect(
+    system_user_changed, sender=User, dispatch_uid="system_user_post_delete")
@@ -0,0 +1,669 @@
+"""Build PDFs from the Latex templates.
+
+A ``PDFBuild`` records the request for a PDF export of an object, see
+``DownloadAdminMixin.pdf``. ``run`` renders the Latex template, compiles it
+with lualatex and stores the PDF, and is called in the background by
+``pythia.tasks``.
+
+The rendered Latex and the files it includes are fingerprinted, and the
+fingerprint is stored next to the PDF. If neither changed since the last
+build, the stored PDF is reused without running lualatex.
+
+Each build runs in its own scratch directory under
+``MEDIA_ROOT/reports/<app_label>.<model_name>/<pk>/``, which replaces the
+current build of the object by an atomic rename once the PDF is stored.
+Builds of the same object can therefore run in parallel.
+
+Objects with ``latex_parts``, like the ARAR, can be compiled in parallel
+parts, one per chapter, which ``<template>.tex`` includes as PDFs, see
+``compile_parts``.
+
+The preambles of the header templates are precompiled into lualatex formats
+with mylatexformat, see ``precompiled_format``.
+"""
+from __future__ import (division, print_function, unicode_literals,
+                        absolute_import)
+import hashlib
+import io
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import traceback
+from multiprocessing.pool import ThreadPool
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.template.loader import render_to_string
+from django.utils import dateformat, formats, timezone
+from django.utils.encoding import force_bytes, force_text
+
+from pythia import conversion
+
+logger = logging.getLogger(__name__)
+
+# Formats which could not be built or used by this process
+failed_formats = set()
+format_lock = threading.Lock()
+engine = {}
+
+FINGERPRINT_SUFFIX = ".fingerprint"
+
+# Absolute or relative file paths in braces, e.g. \includegraphics{./media/x}
+FILE_RE = re.compile(r"\{(\.?/[^{}\s%]+)\}")
+
+# Files holding the cross-references of a build
+REFERENCE_EXTENSIONS = (".aux", ".toc", ".lof", ".lot")
+
+# Files of the current build copied into a new build
+SEED_EXTENSIONS = REFERENCE_EXTENSIONS + (".log",)
+
+# Lines of the .aux file that are read back as cross-references
+AUX_REFERENCE_RE = re.compile(r"\\(newlabel|bibcite)\b")
+
+# Table of contents entries in the .aux file of a part
+TOC_RE = re.compile(r"^\\@writefile\{toc\}\{(.*)\}\s*$")
+CONTENTSLINE_RE = re.compile(
+    r"^\\contentsline\s*\{(?P<level>\w+)\}\{(?P<title>.*)\}"
+    r"\{(?P<page>\d+)\}\{(?P<anchor>[^{}]*)\}"
+    r"(?P<suffix>(\\protected@file@percent\s*)?)$")
+BOOKMARK_LEVELS = {
+    "chapter": 0, "section": 1, "subsection": 2, "subsubsection": 3}
+
+# End of the preamble precompiled into a format, see mylatexformat
+FORMAT_MARKER = "\\csname endofdump\\endcsname"
+COMMENT_RE = re.compile(r"^[ \t]*%.*\n?", re.MULTILINE)
+
+# Page count in the lualatex log
+PAGES_RE = re.compile(r"Output written on .*\((\d+) pages?")
+
+# Warnings asking for another lualatex pass
+RERUN_RE = re.compile(
+    r"Rerun to get|Label\(s\) may have changed|Please rerun|Rerun LaTeX|"
+    r"Table widths have changed")
+
+
+def get_context(obj, baseurl="", embed=True, headers=True):
+    """Return the template context for the Latex export of an object."""
+    return {
+        'original': obj,
+        'embed': embed,
+        'headers': headers,
+        'title': obj.download_title,
+        'subtitle': obj.download_subtitle,
+        'timestamp': timezone.localtime(timezone.now()),
+        'downloadname': obj.__str__(),
+        'baseurl': baseurl,
+        'STATIC_ROOT': settings.STATIC_ROOT,
+        'MEDIA_ROOT': settings.MEDIA_ROOT,
+        'link_sdis': False
+    }
+
+
+def prime(obj):
+    """Convert the rich text of an object in batches ahead of rendering."""
+    if hasattr(obj, "latex_fragments"):
+        logger.info("PDF export: batch converting rich text")
+        conversion.prime_html2latex(obj.latex_fragments())
+
+
+def render(obj, template, context):
+    """Render the Latex template ``latex/<template>.tex`` for an object."""
+    logger.info("PDF export: render to string")
+    return render_to_string("latex/" + template + ".tex", context)
+
+
+def render_document(obj, template, context):
+    """Render an object and its parts, see ``render`` and ``render_parts``.
+
+    The rich text is converted once, before any template renders it.
+    Returns the Latex and the list of (jobname, Latex) tuples of the parts.
+    """
+    prime(obj)
+    parts = render_parts(obj, template, context)
+    return render(obj, template, context), parts
+
+
+def render_parts(obj, template, context):
+    """Render the parts of an object as ``latex/<template>_part.tex``.
+
+    Returns a list of (jobname, Latex) tuples, which is empty if the object
+    has no parts or ``settings.LATEX_PARALLEL_PARTS`` is off. The jobnames
+    are added to ``context["parts"]``.
+    """
+    if not (getattr(settings, "LATEX_PARALLEL_PARTS", True) and
+            hasattr(obj, "latex_parts")):
+        return []
+
+    logger.info("PDF export: render parts to string")
+    parts = []
+    for i, (name, part_template, part_context) in enumerate(
+            obj.latex_parts(), 1):
+        part_context = dict(context, part_template=part_template,
+                            **part_context)
+        parts.append((
+            "{0}-{1:02d}-{2}".format(template, i, name),
+            render_to_string("latex/" + template + "_part.tex", part_context)))
+    context["parts"] = [jobname for jobname, output in parts]
+    return parts
+
+
+def reference_state(directory, template):
+    """Return the cross-reference state written by a lualatex pass.
+
+    This is the labels and citations in the .aux file, and the tables of
+    contents, figures and tables. Other .aux content does not change the
+    output of the next pass.
+    """
+    state = [""]
+    aux = os.path.join(directory, template + ".aux")
+    if os.path.exists(aux):
+        with io.open(aux, encoding="utf-8", errors="replace") as f:
+            state[0] = "".join(
+                line for line in f if AUX_REFERENCE_RE.match(line))
+    for ext in REFERENCE_EXTENSIONS[1:]:
+        path = os.path.join(directory, template + ext)
+        if os.path.exists(path):
+            with io.open(path, encoding="utf-8", errors="replace") as f:
+                state.append(f.read())
+        else:
+            state.append(None)
+    return state
+
+
+def engine_version():
+    """Return the lualatex version string, which formats depend on."""
+    if "version" not in engine:
+        try:
+            engine["version"] = force_text(
+                subprocess.check_output(["lualatex", "--version"]))
+        except (OSError, subprocess.CalledProcessError):
+            engine["version"] = ""
+    return engine["version"]
+
+
+def format_directory():
+    """Return the directory of the precompiled formats."""
+    directory = getattr(settings, "LATEX_FORMAT_DIR", None) or os.path.join(
+        settings.MEDIA_ROOT, "reports", "formats")
+    if not os.path.exists(directory):
+        try:
+            os.makedirs(directory)
+        except OSError:
+            if not os.path.isdir(directory):
+                raise
+    return directory
+
+
+def format_name(output):
+    """Return the name of the format for Latex output, or None.
+
+    The format contains the preamble up to ``FORMAT_MARKER`` of the header
+    templates and is named after a hash of it and the lualatex version, so
+    that each header variant has its own format, and changing a header
+    template or upgrading lualatex creates a new one. Comment lines are not
+    hashed, as some of them contain template variables.
+    """
+    index = output.find(FORMAT_MARKER)
+    if index == -1:
+        return None
+    digest = hashlib.sha1(force_bytes(COMMENT_RE.sub("", output[:index])))
+    digest.update(force_bytes(engine_version()))
+    return "pythia-{0}".format(digest.hexdigest()[:16])
+
+
+def precompiled_format(output):
+    """Return the path to the precompiled format for Latex output, or None.
+
+    The format is built with mylatexformat on first use, in a scratch
+    directory which is then renamed into ``format_directory()``. Returns
+    None if formats are disabled by ``settings.LATEX_FORMATS``, the output
+    has no ``FORMAT_MARKER``, or the format can not be built.
+    """
+    name = format_name(output)
+    if (not getattr(settings, "LATEX_FORMATS", True) or name is None or
+            name in failed_formats):
+        return None
+
+    fmt = os.path.join(format_directory(), name + ".fmt")
+    with format_lock:
+        if os.path.exists(fmt):
+            return fmt
+
+        logger.info("PDF export: building format {0}".format(name))
+        directory = tempfile.mkdtemp(dir=format_directory())
+        try:
+            with io.open(os.path.join(directory, name + ".tex"), "w",
+                         encoding="utf-8") as f:
+                f.write(output)
+            cmd = ["lualatex", "--ini", "--interaction", "batchmode",
+                   "--jobname", name, "&lualatex", "mylatexformat.ltx",
+                   name + ".tex"]
+            try:
+                subprocess.check_output(cmd, cwd=directory)
+            except subprocess.CalledProcessError as e:
+                logger.debug("Expected return from lualatex: {0}".format(e))
+
+            built = os.path.join(directory, name + ".fmt")
+            if not os.path.exists(built):
+                logger.error("PDF export: could not build format {0}:\n{1}"
+                             .format(name, read_log(directory, name)))
+                failed_formats.add(name)
+                return None
+            os.rename(built, fmt)
+        finally:
+            discard(directory)
+    return fmt
+
+
+def compile_tex(directory, template, use_format=True):
+    """Compile ``<template>.tex`` in ``directory``, return the PDF path.
+
+    Like latexmk, lualatex is rerun until the cross-references converge or
+    the log asks for a rerun no more, up to ``settings.LATEX_MAX_PASSES``
+    passes. References copied into ``directory`` from the previous build are
+    reused, so that an unchanged document compiles in one pass.
+
+    The preamble is loaded from a precompiled format if possible. If no PDF
+    is produced with the format, the document is compiled again without it.
+
+    Returns None if lualatex did not produce a PDF.
+    """
+    texname = template + ".tex"
+    pdffile = os.path.join(directory, template + ".pdf")
+    cmd = ['lualatex', "--interaction", "batchmode", "--output-directory",
+           directory, texname]
+    max_passes = getattr(settings, "LATEX_MAX_PASSES", 5)
+
+    fmt = None
+    if use_format and os.path.exists(os.path.join(directory, texname)):
+        with io.open(os.path.join(directory, texname),
+                     encoding="utf-8") as f:
+            fmt = precompiled_format(f.read())
+    if fmt:
+        # lualatex looks up formats in the working directory
+        link = os.path.join(directory, os.path.basename(fmt))
+        if not os.path.lexists(link):
+            os.symlink(fmt, link)
+        name = os.path.splitext(os.path.basename(fmt))[0]
+        cmd[1:1] = ["--fmt", name]
+
+    logger.info("PDF export: processing tex to PDF")
+    state = reference_state(directory, template)
+    for i in range(1, max_passes + 1):
+        try:
+            subprocess.check_output(cmd, cwd=directory)
+        except subprocess.CalledProcessError as e:
+            # lualatex returns non-zero on warnings in batchmode
+            logger.debug("Expected return from lualatex: {0}".format(e))
+
+        previous_state, state = state, reference_state(directory, template)
+        if (state == previous_state and
+                not RERUN_RE.search(read_log(directory, template))):
+            break
+    logger.info("PDF export: {0} lualatex passes".format(i))
+
+    if fmt and not os.path.exists(pdffile):
+        logger.error("PDF export: format {0} failed, compiling without it"
+                     .format(name))
+        failed_formats.add(name)
+        return compile_tex(directory, template, use_format=False)
+    return pdffile if os.path.exists(pdffile) else None
+
+
+def read_log(directory, template):
+    """Return the lualatex log or an empty string."""
+    logfile = os.path.join(directory, template + ".log")
+    if not os.path.exists(logfile):
+        return ""
+    with io.open(logfile, encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def output_directory(obj):
+    """Return the directory holding the Latex builds of an object.
+
+    The directory is keyed by app label, model name and primary key, so that
+    objects of different models with the same id do not share builds.
+    """
+    opts = obj._meta
+    directory = os.path.join(
+        settings.MEDIA_ROOT, "reports",
+        "{0}.{1}".format(opts.app_label, opts.model_name), str(obj.pk))
+    if not os.path.exists(directory):
+        try:
+            os.makedirs(directory)
+        except OSError:
+            # created by a concurrent build
+            if not os.path.isdir(directory):
+                raise
+    return directory
+
+
+def prepare_directory(obj, template):
+    """Return a new scratch directory for one build of an object.
+
+    Every build runs in its own directory, so that concurrent builds of the
+    same object do not overwrite each other's files. The cross-references of
+    the current build are copied in, see ``compile_tex``, and MEDIA_ROOT is
+    linked so that relative image paths work from within the directory.
+    The directory is created next to the current build, so that ``publish``
+    can rename it into place.
+    """
+    parent = output_directory(obj)
+    directory = tempfile.mkdtemp(prefix=template + "-", dir=parent)
+
+    current = os.path.join(parent, template)
+    if os.path.isdir(current):
+        for filename in os.listdir(current):
+            if os.path.splitext(filename)[1] in SEED_EXTENSIONS:
+                shutil.copy2(os.path.join(current, filename), directory)
+
+    os.symlink(settings.MEDIA_ROOT, os.path.join(directory, "media"))
+    return directory
+
+
+def publish(directory, template):
+    """Make a scratch directory the current build of its object.
+
+    The current build is a symlink ``<template>`` next to the scratch
+    directories, and is replaced by an atomic rename. Scratch directories
+    of earlier builds are removed once they are older than
+    ``settings.PDF_BUILD_TIMEOUT``, so that a build still running or a PDF
+    still being copied is never removed from under a worker.
+    """
+    parent, name = os.path.split(directory)
+    current = os.path.join(parent, template)
+    link = os.path.join(parent, "." + name)
+    os.symlink(name, link)
+    os.rename(link, current)
+    logger.info("PDF export: published {0}".format(directory))
+
+    timeout = getattr(settings, "PDF_BUILD_TIMEOUT", 3600)
+    cutoff = time.time() - timeout
+    for other in os.listdir(parent):
+        path = os.path.join(parent, other)
+        if (other != name and other.startswith(template + "-") and
+                not os.path.islink(path) and os.path.isdir(path) and
+                os.path.getmtime(path) < cutoff):
+            discard(path)
+
+
+def discard(directory):
+    """Remove a scratch directory."""
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def page_count(directory, jobname):
+    """Return the number of pages in the lualatex log, or None."""
+    match = PAGES_RE.search(read_log(directory, jobname))
+    return int(match.group(1)) if match else None
+
+
+def labels(directory, jobname):
+    """Return the label definitions in the .aux file of a job."""
+    aux = os.path.join(directory, jobname + ".aux")
+    if not os.path.exists(aux):
+        return ""
+    with io.open(aux, encoding="utf-8", errors="replace") as f:
+        return "".join(line for line in f if line.startswith("\\newlabel"))
+
+
+def compile_parts(directory, parts):
+    """Compile the parts of a document in parallel.
+
+    Each part starts on the page after the last page of the preceding part,
+    and knows the labels of the other parts. Both depend on how the other
+    parts compile, so parts are recompiled until their first pages and
+    labels converge, up to ``settings.LATEX_MAX_PASSES`` rounds. The page
+    counts and labels of the previous build are the first guess, so that an
+    unchanged document compiles in one round.
+
+    Returns the first page of each part, or None if a part failed.
+    """
+    jobnames = [jobname for jobname, output in parts]
+    for jobname, output in parts:
+        with io.open(os.path.join(directory, jobname + ".tex"), "w",
+                     encoding="utf-8") as f:
+            f.write(output)
+
+    max_rounds = getattr(settings, "LATEX_MAX_PASSES", 5)
+    workers = getattr(settings, "LATEX_PART_WORKERS", 2)
+    pool = ThreadPool(max(1, min(workers, len(jobnames))))
+    compiled = [None] * len(jobnames)
+    try:
+        for i in range(1, max_rounds + 1):
+            part_labels = [labels(directory, j) for j in jobnames]
+            inputs = []
+            first = 1
+            for k, jobname in enumerate(jobnames):
+                refs = "".join(part_labels[:k] + part_labels[k + 1:])
+                inputs.append((first, refs))
+                first += page_count(directory, jobname) or 0
+
+            pending = [k for k, value in enumerate(inputs)
+                       if value != compiled[k]]
+            if not pending:
+                break
+            logger.info("PDF export: round {0}, compiling {1} of {2} parts"
+                        .format(i, len(pending), len(jobnames)))
+            for k in pending:
+                first_page, refs = compiled[k] = inputs[k]
+                path = os.path.join(directory, jobnames[k])
+                with io.open(path + ".page", "w", encoding="utf-8") as f:
+                    f.write("\\setcounter{{page}}{{{0}}}\n".format(first_page))
+                with io.open(path + ".refs", "w", encoding="utf-8") as f:
+                    f.write(refs)
+
+            results = pool.map(
+                lambda k: compile_tex(directory, jobnames[k]), pending)
+            if not all(results):
+                return None
+    finally:
+        pool.close()
+        pool.join()
+
+    return [first for first, refs in compiled]
+
+
+def write_contents(directory, template, jobnames, first_pages):
+    """Write the table of contents and bookmarks of the parts.
+
+    The entries link to the pages which ``\\includepdf`` inserts with the
+    ``link`` option, named ``<jobname>.<page of the part>``.
+    """
+    contents = []
+    bookmarks = []
+    for jobname, first in zip(jobnames, first_pages):
+        aux = os.path.join(directory, jobname + ".aux")
+        if not os.path.exists(aux):
+            continue
+        with io.open(aux, encoding="utf-8", errors="replace") as f:
+            entries = [m.group(1) for m in map(TOC_RE.match, f) if m]
+        for entry in entries:
+            match = CONTENTSLINE_RE.match(entry)
+            if not match:
+                contents.append(entry)
+                continue
+            page = int(match.group("page")) - first + 1
+            dest = "{0}.{1}".format(jobname, page)
+            contents.append("{0}{{{1}}}{{{2}}}{3}".format(
+                entry[:match.start("page") - 1], match.group("page"), dest,
+                match.group("suffix")))
+            if match.group("level") in BOOKMARK_LEVELS:
+                bookmarks.append("\\bookmark[dest={{{0}}},level={1}]{{{2}}}"
+                                 .format(dest,
+                                         BOOKMARK_LEVELS[match.group("level")],
+                                         match.group("title")))
+
+    for ext, lines in ((".toc", contents), (".bookmarks", bookmarks)):
+        path = os.path.join(directory, template + ext)
+        with io.open(path, "w", encoding="utf-8") as f:
+            f.write("".join(line + "\n" for line in lines))
+
+
+def build(directory, template, output, parts=()):
+    """Compile Latex output to PDF, return the PDF path and the Latex log.
+
+    ``parts`` are compiled first, see ``compile_parts``.
+    """
+    if parts:
+        jobnames = [jobname for jobname, part in parts]
+        first_pages = compile_parts(directory, parts)
+        if first_pages is None:
+            failed = [j for j in jobnames if not os.path.exists(
+                os.path.join(directory, j + ".pdf"))]
+            return None, "\n".join(read_log(directory, j) for j in failed)
+        write_contents(directory, template, jobnames, first_pages)
+
+    with io.open(os.path.join(directory, template + ".tex"), "w",
+                 encoding="utf-8") as f:
+        f.write(output)
+
+    return compile_tex(directory, template), read_log(directory, template)
+
+
+def fingerprint(output, directory, timestamp):
+    """Return a fingerprint of Latex output and the files it includes.
+
+    Included files are fingerprinted by modification time and size.
+    The print timestamp is left out, so that unchanged objects keep their
+    fingerprint.
+    """
+    digest = hashlib.sha1()
+    for rendered in (formats.localize(timestamp),
+                     dateformat.format(timestamp, "r")):
+        output = output.replace(rendered, "")
+    digest.update(force_bytes(output))
+
+    for path in sorted(set(FILE_RE.findall(output))):
+        fullpath = os.path.join(directory, path)
+        for candidate in (fullpath, fullpath + ".sty"):
+            if os.path.isfile(candidate):
+                stat = os.stat(candidate)
+                digest.update(force_bytes("{0}:{1}:{2}".format(
+                    path, stat.st_mtime, stat.st_size)))
+                break
+        else:
+            digest.update(force_bytes("{0}:missing".format(path)))
+    return digest.hexdigest()
+
+
+def current_pdf(obj, pdf_build):
+    """Return the latest PDF of an object as FieldFile, or None."""
+    from pythia.models import PDFBuild
+    if hasattr(obj, "pdf"):
+        pdf = obj.pdf
+    else:
+        previous = PDFBuild.objects.filter(
+            content_type=pdf_build.content_type,
+            object_id=pdf_build.object_id,
+            template=pdf_build.template,
+            status=PDFBuild.STATUS_DONE
+        ).exclude(pk=pdf_build.pk).exclude(pdf="").first()
+        pdf = previous.pdf if previous else None
+    if pdf and pdf.storage.exists(pdf.name):
+        return pdf
+    return None
+
+
+def read_fingerprint(pdf):
+    """Return the fingerprint stored next to a PDF, or None."""
+    name = pdf.name + FINGERPRINT_SUFFIX
+    if not pdf.storage.exists(name):
+        return None
+    f = pdf.storage.open(name)
+    try:
+        return force_text(f.read()).strip()
+    finally:
+        f.close()
+
+
+def write_fingerprint(pdf, value):
+    """Store a fingerprint next to a PDF."""
+    name = pdf.name + FINGERPRINT_SUFFIX
+    if pdf.storage.exists(name):
+        pdf.storage.delete(name)
+    pdf.storage.save(name, ContentFile(force_bytes(value)))
+
+
+def save(obj, pdf_build, pdffile):
+    """Store a PDF in ``obj.pdf``, or in ``pdf_build.pdf`` without one.
+
+    Only the file field is updated, so that exporting an object neither
+    changes its audit trail nor fires its save signals.
+    Returns the FieldFile of the stored PDF.
+    """
+    filename = "{0}.pdf".format(obj.__str__())
+    with open(pdffile, "rb") as f:
+        if hasattr(obj, "pdf"):
+            obj.pdf.save(filename, File(f), save=False)
+            obj._default_manager.filter(pk=obj.pk).update(pdf=obj.pdf.name)
+            return obj.pdf
+        pdf_build.pdf.save(filename, File(f), save=False)
+        return pdf_build.pdf
+
+
+def run(build_id):
+    """Run a queued ``PDFBuild``."""
+    from pythia.models import PDFBuild
+    pdf_build = PDFBuild.objects.get(pk=build_id)
+    if pdf_build.status != PDFBuild.STATUS_QUEUED:
+        logger.info("{0} is not queued, skipping".format(pdf_build))
+        return
+
+    pdf_build.status = PDFBuild.STATUS_RUNNING
+    pdf_build.started = timezone.now()
+    pdf_build.save()
+    logger.info("{0} started".format(pdf_build))
+
+    directory = None
+    try:
+        obj = pdf_build.content_object
+        context = get_context(obj, baseurl=pdf_build.baseurl,
+                              embed=pdf_build.embed,
+                              headers=pdf_build.headers)
+        output, parts = render_document(obj, pdf_build.template, context)
+        directory = prepare_directory(obj, pdf_build.template)
+        new_fingerprint = fingerprint(
+            output + "".join(part for jobname, part in parts),
+            directory, context["timestamp"])
+        previous = current_pdf(obj, pdf_build)
+
+        if previous and read_fingerprint(previous) == new_fingerprint:
+            logger.info("PDF export: unchanged, reusing {0}".format(
+                previous.name))
+            pdffile = None
+            pdf_build.log = "Unchanged since the last build."
+            if not hasattr(obj, "pdf"):
+                pdf_build.pdf = previous.name
+            pdf_build.status = PDFBuild.STATUS_DONE
+        else:
+            pdffile, pdf_build.log = build(
+                directory, pdf_build.template, output, parts)
+
+        if pdffile:
+            pdf = save(obj, pdf_build, pdffile)
+            write_fingerprint(pdf, new_fingerprint)
+            publish(directory, pdf_build.template)
+            directory = None
+            pdf_build.status = PDFBuild.STATUS_DONE
+        elif pdf_build.status != PDFBuild.STATUS_DONE:
+            logger.error("Error creating PDF for {0}".format(pdf_build))
+            pdf_build.status = PDFBuild.STATUS_FAILED
+    except Exception:
+        logger.exception("{0} failed".format(pdf_build))
+        pdf_build.status = PDFBuild.STATUS_FAILED
+        pdf_build.log = traceback.format_exc()
+    finally:
+        if directory:
+            discard(directory)
+
+    pdf_build.finished = timezone.now()
+    pdf_build.save()
+    logger.info("{0} finished".format(pdf_build))
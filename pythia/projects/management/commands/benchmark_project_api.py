@@ -0,0 +1,106 @@
+"""Benchmark the project list API against seeded projects."""
+from __future__ import (division, print_function, unicode_literals,
+                        absolute_import)
+from optparse import make_option
+import time
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from pythia.api import ProjectViewSet
+from pythia.models import Program, Service, User
+from pythia.projects.models import (
+    Project, ScienceProject, CoreFunctionProject, CollaborationProject,
+    StudentProject)
+
+# Seeded projects use years no real project has
+SEED_YEAR = 1900
+
+REQUESTS = (
+    ("First page", {"format": "json"}),
+    ("Largest page", {"format": "json", "page_size": 1000}),
+    ("JSON export", {"format": "json", "export": ""}),
+    ("CSV export", {"format": "csv"}),
+)
+
+
+class Rollback(Exception):
+    """Discard the seeded projects."""
+
+    pass
+
+
+def seed_projects(count, user):
+    """Create ``count`` projects of all types, spread over programs."""
+    programs = list(Program.objects.all()[:20]) or [None]
+    services = list(Service.objects.all()[:5]) or [None]
+    ctypes = [ContentType.objects.get_for_model(model) for model in (
+        ScienceProject, CoreFunctionProject, CollaborationProject,
+        StudentProject)]
+    Project.objects.bulk_create([
+        Project(
+            type=i % len(ctypes),
+            polymorphic_ctype=ctypes[i % len(ctypes)],
+            year=SEED_YEAR + i // 1000,
+            number=i % 1000 + 1,
+            title="Benchmark project {0}".format(i),
+            status=Project.STATUS_ACTIVE,
+            program=programs[i % len(programs)],
+            output_program=services[i % len(services)],
+            project_owner=user,
+            creator=user,
+            modifier=user,
+            team_list_plain=user.fullname)
+        for i in range(count)], batch_size=500)
+
+
+class Command(BaseCommand):
+    """Count the queries and time of project list API requests.
+
+    The projects are seeded in a transaction which is rolled back.
+    """
+
+    help = "Benchmark the project list API against seeded projects."
+    option_list = BaseCommand.option_list + (
+        make_option(
+            "--projects", type="int", dest="projects", default=5000,
+            help="Number of projects to seed."),
+    )
+
+    def handle(self, *args, **options):
+        """Seed projects, request the API and report."""
+        try:
+            with transaction.atomic():
+                user, created = User.objects.get_or_create(
+                    username="api-benchmark",
+                    defaults={"first_name": "API", "last_name": "Benchmark"})
+                seed_projects(options["projects"], user)
+                self.stdout.write("Seeded {0} projects, {1} in total.".format(
+                    options["projects"], Project.objects.count()))
+                for label, params in REQUESTS:
+                    self.benchmark(label, params, user)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def benchmark(self, label, params, user):
+        """Request the project list and report queries and time."""
+        view = ProjectViewSet.as_view({"get": "list"})
+        request = APIRequestFactory().get("/api/projects/", params)
+        force_authenticate(request, user=user)
+        start = time.time()
+        with CaptureQueriesContext(connection) as queries:
+            response = view(request)
+            if response.streaming:
+                size = sum(len(chunk) for chunk in response.streaming_content)
+            else:
+                size = len(response.render().content)
+        seconds = time.time() - start
+        self.stdout.write(
+            "{0}: status {1}, {2} KiB, {3} queries, {4:.2f} s.".format(
+                label, response.status_code, size // 1024, len(queries),
+                seconds))
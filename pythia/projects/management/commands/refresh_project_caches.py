@@ -0,0 +1,40 @@
+"""Refresh the cached team and area lists of projects."""
+from __future__ import (division, print_function, unicode_literals,
+                        absolute_import)
+from datetime import datetime
+from optparse import make_option
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from pythia.projects.models import refresh_all_project_caches
+
+
+class Command(BaseCommand):
+    """Refresh the cached team and area lists of all projects."""
+
+    help = "Refresh the cached team and area lists of projects."
+    option_list = BaseCommand.option_list + (
+        make_option(
+            "--since", dest="since", default=None, metavar="YYYY-MM-DD",
+            help="Only refresh projects modified since this date."),
+    )
+
+    def handle(self, *args, **options):
+        """Refresh and report the time taken."""
+        since = options["since"]
+        if since:
+            try:
+                since = timezone.make_aware(
+                    datetime.strptime(since, "%Y-%m-%d"),
+                    timezone.get_current_timezone())
+            except ValueError:
+                raise CommandError("--since must be a date as YYYY-MM-DD.")
+
+        start = time.time()
+        count = refresh_all_project_caches(since=since)
+        seconds = time.time() - start
+        self.stdout.write(
+            "Refreshed {0} projects in {1:.2f} s ({2:.1f} projects/s).".format(
+                count, seconds, count / seconds if seconds else 0))
@@ -14,14 +14,18 @@ occurs), Areas of relevance (Project findings apply to).
 from __future__ import (division, print_function, unicode_literals,
                         absolute_import)
 
+from collections import defaultdict
+from contextlib import contextmanager
 from datetime import date
 from itertools import chain
 import logging
+import threading
 from tabnanny import verbose
 
 from django.conf import settings
 from django.contrib.auth.models import Group
-from django.db import models
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, models, transaction
 from django.db.models import signals
 import django.db.models.options as options
 from django.utils.encoding import python_2_unicode_compatible
@@ -33,8 +37,10 @@ from django_fsm import FSMField, transition
 from django_resized import ResizedImageField
 from polymorphic import PolymorphicModel, PolymorphicManager
 
+from pythia import apicache
 from pythia.documents.models import (
-    ConceptPlan, ProgressReport, ProjectClosure, StudentReport)
+    ConceptPlan, Document, ProgressReport, ProjectClosure, StudentReport,
+    sync_document_tasks)
 from pythia.models import ActiveGeoModelManager, Audit, ActiveModel
 from pythia.models import Program, WebResource, Service, Area, User
 from pythia.reports.models import ARARReport
@@ -355,6 +361,12 @@ class Project(PolymorphicModel, Audit, ActiveModel):
         help_text=_("DBCA Region names."))
     # end dirty hacks
     # -------------------------------------------------------------------------#
+    cache_fields = (
+        "team_list_plain", "supervising_scientist_list_plain",
+        "student_list_plain", "academic_list_plain",
+        "academic_list_plain_no_affiliation", "staff_list_plain",
+        "area_list_dpaw_region", "area_list_dpaw_district",
+        "area_list_ibra_imcra_region", "area_list_nrm_region")
 
     objects = ProjectManager()
     published = PublishedProjectManager()
@@ -922,23 +934,31 @@ class Project(PolymorphicModel, Audit, ActiveModel):
             area_type=Area.AREA_TYPE_NRM_REGION)])
 
 
-def project_areas_changed(sender, **kwargs):
+def project_areas_changed(sender, instance, action, reverse, pk_set,
+                          **kwargs):
     """
     Update cached Area names on Project.
 
     This method is called from a m2m_changed signal whenever
-    project areas are changed.
+    project areas are changed. The area lists of the changed projects are
+    computed from one query and written with one UPDATE, see
+    ``area_cache_fields``.
     """
-    p = kwargs['instance']
-    p.area_list_dpaw_region = p.area_dpaw_region
-    p.area_list_dpaw_district = p.area_dpaw_district
-    p.area_list_ibra_imcra_region = p.area_ibra_imcra_region
-    p.area_list_nrm_region = p.area_nrm_region
-    p.save(update_fields=[
-        'area_list_dpaw_region',
-        'area_list_dpaw_district',
-        'area_list_ibra_imcra_region',
-        'area_list_nrm_region'])
+    if reverse and action == "pre_clear":
+        # area.project_set.clear(): remember the projects losing the area
+        instance._cleared_projects = list(
+            instance.project_set.values_list("pk", flat=True))
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        pks = [instance.pk]
+    elif action == "post_clear":
+        pks = getattr(instance, "_cleared_projects", [])
+    else:
+        pks = list(pk_set)
+    if pks:
+        update_project_caches(dict.fromkeys(pks, Project),
+                              area_cache_fields(pks))
 signals.m2m_changed.connect(project_areas_changed,
                             sender=Project.areas.through)
 
@@ -1600,84 +1620,214 @@ class ProjectMembership(models.Model):
             self.comments))
 
 
+# The cached member lists of projects: the field, the project classes having
+# the field (None for all), the member roles and the user name attribute.
+MEMBER_CACHE_FIELDS = (
+    ("team_list_plain", None, ProjectMembership.ROLES_STAFF,
+     "abbreviated_name"),
+    ("supervising_scientist_list_plain", None,
+     (ProjectMembership.ROLE_SUPERVISING_SCIENTIST, ), "abbreviated_name"),
+    ("student_list_plain", (StudentProject, ),
+     (ProjectMembership.ROLE_SUPERVISED_STUDENT, ),
+     "abbreviated_name_no_affiliation"),
+    ("academic_list_plain", (StudentProject, ),
+     (ProjectMembership.ROLE_ACADEMIC_SUPERVISOR, ), "abbreviated_name"),
+    ("academic_list_plain_no_affiliation", (StudentProject, ),
+     (ProjectMembership.ROLE_ACADEMIC_SUPERVISOR, ),
+     "abbreviated_name_no_affiliation"),
+    ("staff_list_plain", (CollaborationProject, ),
+     ProjectMembership.ROLES_STAFF, "abbreviated_name"),
+)
+
+_deferred = threading.local()
+
+
+def member_cache_fields(pks):
+    """Return the cached member lists of projects from one query.
+
+    Returns the project classes and the cached fields by project id.
+    """
+    types = dict(
+        (pk, ContentType.objects.get_for_id(ctype).model_class()
+         if ctype else Project)
+        for pk, ctype in Project.objects.filter(pk__in=pks).values_list(
+            "pk", "polymorphic_ctype"))
+    members = defaultdict(list)
+    for m in ProjectMembership.objects.filter(
+            project_id__in=list(types)).select_related("user").order_by(
+            "position", "user__last_name", "user__first_name"):
+        members[m.project_id].append(m)
+
+    fields = dict(
+        (pk, dict(
+            (field, ", ".join(getattr(m.user, attr)
+                              for m in members[pk] if m.role in roles))
+            for field, classes, roles, attr in MEMBER_CACHE_FIELDS
+            if classes is None or issubclass(model, classes)))
+        for pk, model in types.items())
+    return types, fields
+
+
+# The cached area lists of projects: the field and the area types.
+AREA_CACHE_FIELDS = (
+    ("area_list_dpaw_region", (Area.AREA_TYPE_DPAW_REGION, )),
+    ("area_list_dpaw_district", (Area.AREA_TYPE_DPAW_DISTRICT, )),
+    ("area_list_ibra_imcra_region", (Area.AREA_TYPE_IBRA_REGION,
+                                     Area.AREA_TYPE_IMCRA_REGION)),
+    ("area_list_nrm_region", (Area.AREA_TYPE_NRM_REGION, )),
+)
+
+
+def area_cache_fields(pks):
+    """Return the cached area lists of projects by project id from one query.
+    """
+    areas = defaultdict(list)
+    for pk, area_type, name in Project.areas.through.objects.filter(
+            project_id__in=pks).order_by(
+            "area__area_type", "-area__northern_extent").values_list(
+            "project_id", "area__area_type", "area__name"):
+        areas[pk].append((area_type, name))
+    return dict(
+        (pk, dict(
+            (field, ", ".join(name for area_type, name in areas[pk]
+                              if area_type in area_types))
+            for field, area_types in AREA_CACHE_FIELDS))
+        for pk in pks)
+
+
+def project_cache_fields(pks):
+    """Return the project classes and all cached fields by project id."""
+    types, fields = member_cache_fields(pks)
+    for pk, values in area_cache_fields(list(types)).items():
+        fields[pk].update(values)
+    return types, fields
+
+
+def update_project_caches(types, fields):
+    """Write the cached fields of projects.
+
+    The fields are written with one UPDATE per table for all projects,
+    without ``Audit.save`` and its revision. The projects keep their
+    modified time, API lists are invalidated through ``pythia.apicache``.
+    """
+    rows = defaultdict(list)
+    db_types = {}
+    for pk, values in fields.items():
+        tables = defaultdict(dict)
+        for name, value in values.items():
+            field, model, direct, m2m = types[pk]._meta.get_field_by_name(
+                name)
+            model = model or types[pk]
+            tables[model][field.column] = field.get_db_prep_save(
+                value, connection=connection)
+            db_types[model, field.column] = field.db_type(connection)
+        for model, columns in tables.items():
+            key = (model, tuple(sorted(columns)))
+            rows[key].append([pk] + [columns[c] for c in key[1]])
+
+    qn = connection.ops.quote_name
+    cursor = connection.cursor()
+    for (model, columns), values in rows.items():
+        table, pk = qn(model._meta.db_table), qn(model._meta.pk.column)
+        if connection.vendor == "postgresql":
+            # VALUES columns are typed from their first row, cast them all
+            row = "({0})".format(", ".join(["%s"] + [
+                "%s::{0}".format(db_types[model, c]) for c in columns]))
+            cursor.execute(
+                "UPDATE {0} SET {1} FROM (VALUES {2}) AS v({3}, {4}) "
+                "WHERE {0}.{5} = v.{3}".format(
+                    table,
+                    ", ".join("{0} = v.{0}".format(qn(c)) for c in columns),
+                    ", ".join([row] * len(values)),
+                    qn("pk"), ", ".join(qn(c) for c in columns), pk),
+                list(chain.from_iterable(values)))
+        else:
+            cursor.executemany(
+                "UPDATE {0} SET {1} WHERE {2} = %s".format(
+                    table, ", ".join("{0} = %s".format(qn(c))
+                                     for c in columns), pk),
+                [v[1:] + v[:1] for v in values])
+    apicache.bump(Project)
+
+
 def refresh_project_cache(p):
     """Refresh all cached area and team fields of a Project p."""
-    p.area_list_dpaw_region = p.area_dpaw_region
-    p.area_list_dpaw_district = p.area_dpaw_district
-    p.area_list_ibra_imcra_region = p.area_ibra_imcra_region
-    p.area_list_nrm_region = p.area_nrm_region
-    p.team_list_plain = p.get_team_list_plain()
-    p.supervising_scientist_list_plain = \
-        p.get_supervising_scientist_list_plain()
-    p.save(update_fields=[
-        'area_list_dpaw_region',
-        'area_list_dpaw_district',
-        'area_list_ibra_imcra_region',
-        'area_list_nrm_region',
-        'team_list_plain',
-        'supervising_scientist_list_plain'])
-    if (p._meta.model_name == 'studentproject'):
-        p.student_list_plain = p.get_student_list_plain()
-        p.academic_list_plain = p.get_academic_list_plain()
-        p.academic_list_plain_no_affiliation = \
-            p.get_academic_list_plain_no_affiliation()
-        p.save(update_fields=['student_list_plain', 'academic_list_plain', ])
-        # p.staff_list_plain = p.get_staff_list_plain()
-        # p.save(update_fields=['staff_list_plain'])
-    if (p._meta.model_name == 'collaborationproject'):
-        p.staff_list_plain = p.get_staff_list_plain()
-        p.save(update_fields=['staff_list_plain'])
+    update_project_caches(*project_cache_fields([p.pk]))
     return True
 
 
-def refresh_all_project_caches():
-    """Refresh cached project membership and area lists."""
-    tmp = [refresh_project_cache(p) for p in
-           Project.objects.select_related("projectmembership_set", "area_set")]
-    return len(tmp)
+def refresh_all_project_caches(since=None):
+    """Refresh cached project membership and area lists.
+
+    The projects are refreshed in batches of
+    ``settings.PROJECT_CACHE_BATCH_SIZE``, each from three queries and
+    written with one UPDATE per project table.
+
+    :param since: only refresh projects modified since this datetime
+    :return: the number of refreshed projects
+    """
+    projects = Project.objects.order_by("pk")
+    if since is not None:
+        projects = projects.filter(modified__gte=since)
+    pks = list(projects.values_list("pk", flat=True))
+    size = getattr(settings, "PROJECT_CACHE_BATCH_SIZE", 500)
+    with transaction.atomic():
+        for i in range(0, len(pks), size):
+            update_project_caches(*project_cache_fields(pks[i:i + size]))
+            logger.debug("Refreshed caches of {0} of {1} projects".format(
+                min(i + size, len(pks)), len(pks)))
+    return len(pks)
+
+
+def refresh_project_caches(pks):
+    """Refresh the cached member lists of projects.
+
+    Within ``deferred_cache_refresh``, the refresh runs once at the end.
+    """
+    pending = getattr(_deferred, "projects", None)
+    if pending is not None:
+        pending.update(pks)
+        return
+    update_project_caches(*member_cache_fields(pks))
+
+
+def defer_cache_refresh():
+    """Collect project cache refreshes until ``flush_cache_refresh``."""
+    _deferred.projects = set()
+
+
+def flush_cache_refresh():
+    """Run the collected project cache refreshes and stop collecting."""
+    pks = getattr(_deferred, "projects", None)
+    _deferred.projects = None
+    if pks:
+        refresh_project_caches(pks)
+
+
+@contextmanager
+def deferred_cache_refresh():
+    """Refresh the caches of projects changed within a block once, at its end.
+
+    Requests run within this block, see
+    ``pythia.middleware.DeferredCacheRefresh``. The collected refreshes are
+    dropped if the block raises an exception.
+    """
+    if getattr(_deferred, "projects", None) is not None:
+        yield
+        return
+    defer_cache_refresh()
+    try:
+        yield
+    except Exception:
+        _deferred.projects = None
+        raise
+    flush_cache_refresh()
 
 
 def refresh_project_member_cache_fields(projectmembership_instance,
                                         remove=False):
     """Refresh the cached Project.team_list_plain, student and staff lists."""
-    try:
-        p = projectmembership_instance.project
-    except Project.DoesNotExist:
-        return
-    p.team_list_plain = p.get_team_list_plain()
-    p.save(update_fields=['team_list_plain'])
-
-    # give user permission to change team?
-    # if remove:
-    #    logger.debug("remove user permission to change/delete"
-    # " team memberships")
-    # TODO remove user's permissions on documents
-    # else:
-    #    logger.debug("grant user permission to change/delete "
-    # "team memberships")
-
-    # some crazyness for StudentProjects and CollaborationProjects
-    if (projectmembership_instance.role ==
-            ProjectMembership.ROLE_SUPERVISING_SCIENTIST):
-        p.supervising_scientist_list_plain = \
-            p.get_supervising_scientist_list_plain()
-        p.save(update_fields=['supervising_scientist_list_plain'])
-    if (projectmembership_instance.role ==
-            ProjectMembership.ROLE_SUPERVISED_STUDENT and
-            p._meta.model_name == 'studentproject'):
-        p.student_list_plain = p.get_student_list_plain()
-        p.save(update_fields=['student_list_plain'])
-    if (projectmembership_instance.role ==
-            ProjectMembership.ROLE_ACADEMIC_SUPERVISOR and
-            p._meta.model_name == 'studentproject'):
-        p.academic_list_plain = p.get_academic_list_plain()
-        p.academic_list_plain_no_affiliation = \
-            p.get_academic_list_plain_no_affiliation()
-        p.save(update_fields=['academic_list_plain',
-                              'academic_list_plain_no_affiliation', ])
-    if (p._meta.model_name == 'collaborationproject'):
-        p.staff_list_plain = p.get_staff_list_plain()
-        p.save(update_fields=['staff_list_plain'])
+    refresh_project_caches([projectmembership_instance.project_id])
 
 
 def projectmembership_post_save(sender, instance, created, **kwargs):
@@ -1688,6 +1838,8 @@ def projectmembership_post_save(sender, instance, created, **kwargs):
      running loaddata to dev/test/uat or restoring database
     """
     refresh_project_member_cache_fields(instance)
+    sync_document_tasks(Document.objects.filter(
+        project_id=instance.project_id, status=Document.STATUS_NEW))
     # from pythia.documents.utils import update_document_permissions as udp
     # [udp(d) for d in instance.project.documents.all()]
 signals.post_save.connect(projectmembership_post_save,
@@ -1701,6 +1853,8 @@ def projectmembership_post_delete(sender, instance, using, **kwargs):
     exists.
     """
     refresh_project_member_cache_fields(instance, remove=True)
+    sync_document_tasks(Document.objects.filter(
+        project_id=instance.project_id, status=Document.STATUS_NEW))
 signals.post_delete.connect(projectmembership_post_delete,
                             sender=ProjectMembership)
 
@@ -1713,3 +1867,18 @@ def project_pre_delete(sender, instance, using, **kwargs):
     [d.delete() for d in instance.documents.all()]
     [m.delete() for m in instance.projectmembership_set.all()]
 signals.pre_delete.connect(project_pre_delete, sender=Project)
+
+
+def project_post_save(sender, instance, created, update_fields=None,
+                      **kwargs):
+    """Post save: update the tasks of project documents.
+
+    The tasks depend on the project status and program.
+    """
+    if created or not isinstance(instance, Project):
+        return
+    if update_fields and not set(["status", "program"]).intersection(
+            update_fields):
+        return
+    sync_document_tasks(instance.documents.all())
+signals.post_save.connect(project_post_save)
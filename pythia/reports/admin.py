@@ -1,6 +1,15 @@
 from __future__ import unicode_literals, absolute_import
 
+from functools import update_wrapper
+
+from django.contrib import messages
+from django.contrib.admin.util import unquote
+from django.core.exceptions import PermissionDenied
+from django.core.urlresolvers import reverse
+from django.http import HttpResponseRedirect, Http404
+
 from pythia.admin import BaseAdmin, DownloadAdminMixin, DetailAdmin
+from pythia.reports.models import kickoff_progress_reports
 
 
 class ARARReportAdmin(BaseAdmin, DownloadAdminMixin, DetailAdmin):
@@ -9,3 +18,40 @@ class ARARReportAdmin(BaseAdmin, DownloadAdminMixin, DetailAdmin):
 
     def queryset(self, request):
         return super(ARARReportAdmin, self).queryset(request)
+
+    def get_urls(self):
+        """Add the URL to resume requesting progress reports."""
+        from django.conf.urls import patterns, url
+
+        def wrap(view):
+            def wrapper(*args, **kwargs):
+                return self.admin_site.admin_view(view)(*args, **kwargs)
+            return update_wrapper(wrapper, view)
+
+        info = self.model._meta.app_label, self.model._meta.model_name
+
+        urlpatterns = patterns(
+            '',
+            url(r'^(\d+)/kickoff/$',
+                wrap(self.kickoff),
+                name='%s_%s_kickoff' % info),
+        )
+        return urlpatterns + super(ARARReportAdmin, self).get_urls()
+
+    def kickoff(self, request, object_id):
+        """Resume requesting progress reports, e.g. after a failure.
+
+        Projects already asked for an update by this ARAR are skipped.
+        """
+        if request.method != "POST":
+            raise PermissionDenied
+        obj = self.get_object(request, unquote(object_id))
+        if obj is None:
+            raise Http404
+        if not self.has_change_permission(request, obj):
+            raise PermissionDenied
+        kickoff_progress_reports(obj)
+        messages.info(request, "Requesting progress reports.")
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return HttpResponseRedirect(
+            reverse('admin:%s_%s_detail' % info, args=(obj.pk,)))
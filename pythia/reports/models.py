@@ -4,18 +4,25 @@ Currently, only the ARAR is implemented.
 """
 from __future__ import (division, print_function, unicode_literals,
                         absolute_import)
+from datetime import timedelta
 import logging
+from itertools import groupby
+import traceback
 
+from django.conf import settings
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import models, transaction
 from django.db.models import signals
+from django.utils import timezone
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.safestring import mark_safe
 from django.utils.translation import ugettext_lazy as _
 
 from django_resized import ResizedImageField
 
+from pythia import apicache
 from pythia import models as pythia_models
+from pythia.middleware import current_user
 from pythia.utils import texify_filename
 
 from south.modelsinspector import add_introspection_rules
@@ -276,6 +283,77 @@ class ARARReport(pythia_models.Audit):
             status=Project.STATUS_ACTIVE
         ).order_by("position", "-year", "-number")
 
+    def latex_fragments(self):
+        """Return all rich text fragments the Latex template converts.
+
+        The fragments mirror the ``html2latex`` calls of ``latex/arar.tex``
+        and its includes, so that they can be converted in batches before
+        rendering, see ``pythia.conversion.prime_html2latex``.
+        """
+        fragments = [self.dm, self.sds_intro, self.pub]
+        programs = set()
+
+        for report in self.progress_reports:
+            project = report.project
+            if project.program_id and project.program_id not in programs:
+                programs.add(project.program_id)
+                fragments += [project.program.name,
+                              project.program.introduction]
+            fragments += [getattr(project, field, None) for field in (
+                "title", "team_list_plain", "area_list_dpaw_region",
+                "area_list_ibra_imcra_region", "area_list_nrm_region")]
+            fragments += [getattr(report, field) for field in (
+                "context", "aims", "progress", "implications", "future")]
+
+        for report in self.student_reports:
+            project = report.project
+            fragments += [getattr(project, field, None) for field in (
+                "title", "supervising_scientist_list_plain",
+                "student_list_plain", "academic_list_plain")]
+            fragments.append(report.progress_report)
+
+        for project in self.collaboration_projects:
+            fragments += [project.name, project.title, project.budget,
+                          project.staff_list_plain]
+
+        return fragments
+
+    def latex_parts(self):
+        """Return the chapters of ``latex/arar.tex`` as separate documents.
+
+        Each part is a tuple of a name, the include template and its
+        context, in the order of ``latex/arar.tex``. Every program gets its
+        own part. ``pythia.pdf.compile_parts`` compiles the parts in
+        parallel, and ``latex/arar.tex`` stitches them together.
+        """
+        reports = sorted(self.progress_reports,
+                         key=lambda r: r.project.program.position)
+        parts = [("sds", "latex/includes/sds.tex", {"original": self})]
+        for program, program_reports in groupby(
+                reports, key=lambda r: r.project.program):
+            parts.append((
+                "program-{0}".format(program.pk),
+                "latex/includes/programs.tex",
+                {"arar": self, "reports": list(program_reports)}))
+        parts += [
+            ("collaboration-projects",
+             "latex/includes/collaboration_projects.tex",
+             {"projects": self.collaboration_projects}),
+            ("student-projects",
+             "latex/includes/student_projects.tex",
+             {"reports": self.student_reports}),
+            ("student-reports",
+             "latex/includes/student_reports.tex",
+             {"arar": self, "reports": self.student_reports}),
+            ("publications",
+             "latex/includes/publications.tex",
+             {"original": self}),
+            ("science-projects",
+             "latex/includes/science_projects.tex",
+             {"reports": reports}),
+        ]
+        return parts
+
     """
     @property
     def science_projects(self):
@@ -323,75 +401,269 @@ class ARARReport(pythia_models.Audit):
         return self._meta
 
 
-def call_update(proj, rep, final=False):
-    """Request a (final) update from a project for a report."""
-    from pythia.projects.models import Project
-    if final:
-        proj.request_final_update(rep)
-        proj.status = Project.STATUS_FINAL_UPDATE
-    else:
-        proj.request_update(rep)
-        proj.status = Project.STATUS_UPDATE
-    proj.save()
-    logger.debug(
-        "{0} processed request for progress report".format(proj.debugname))
+@python_2_unicode_compatible
+class ARARKickoff(models.Model):
+    """The request of progress reports for an ARAR, run in the background.
 
+    See ``run_kickoff`` and ``pythia.tasks``.
+    """
 
-def request_progress_reports(instance):
-    """Call Project.request_update() for each active or closing project.
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = (
+        (STATUS_QUEUED, _("Queued")),
+        (STATUS_RUNNING, _("Running")),
+        (STATUS_DONE, _("Done")),
+        (STATUS_FAILED, _("Failed")),
+    )
+    PENDING = (STATUS_QUEUED, STATUS_RUNNING)
+    # Queued kickoffs not started within this time have lost their job
+    STALE_AFTER = timedelta(minutes=10)
+
+    report = models.ForeignKey(ARARReport, related_name="kickoffs")
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED,
+        db_index=True)
+    total = models.PositiveIntegerField(default=0, editable=False)
+    done = models.PositiveIntegerField(default=0, editable=False)
+    created = models.DateTimeField(default=timezone.now, editable=False)
+    started = models.DateTimeField(blank=True, null=True, editable=False)
+    finished = models.DateTimeField(blank=True, null=True, editable=False)
+    log = models.TextField(blank=True, editable=False)
 
-    This function is run as post_save signal when a new ARARReport is created.
+    class Meta:
+        """Class opts."""
 
-    Projects are nominated for an update through:
-    
-    * The project is of a type requiring an update (SP, CF, STP).
-    * The project belongs to a Division nominated in self.divisions.
-    * The project is of a status that requires an update (active or closing).
+        app_label = 'pythia'
+        ordering = ['-created']
+        get_latest_by = 'created'
+        verbose_name = _("ARAR kickoff")
+        verbose_name_plural = _("ARAR kickoffs")
+
+    def __str__(self):
+        """String representation."""
+        return "ARAR kickoff {0} of {1} ({2})".format(
+            self.pk, self.report_id, self.status)
+
+    @property
+    def is_pending(self):
+        """Whether the kickoff is queued or running."""
+        return self.status in self.PENDING
+
+    @property
+    def is_stale(self):
+        """Whether the kickoff is queued for too long to be started."""
+        return (self.status == self.STATUS_QUEUED and
+                self.created < timezone.now() - self.STALE_AFTER)
+
+    @property
+    def percent(self):
+        """The percentage of projects processed."""
+        if not self.total:
+            return 100 if self.status == self.STATUS_DONE else 0
+        return int(100 * self.done / self.total)
+
+    @classmethod
+    def request(cls, report):
+        """Return a queued kickoff of ``report`` or a new one.
+
+        A queued kickoff also processes projects nominated after it was
+        requested, so there is no need for a second one.
+        """
+        queued = cls.objects.filter(report=report, status=cls.STATUS_QUEUED)
+        if queued.exists():
+            return queued.latest(), False
+        return cls.objects.create(report=report), True
+
+
+@python_2_unicode_compatible
+class ProgressReportRequest(models.Model):
+    """A project of which an ARAR has requested a (final) update.
+
+    The requests are the checkpoints of ``ARARKickoff``: an ARAR requests
+    each kind of update from a project only once.
     """
-    logger.info("{0} requesting ProgressReports from Projects of Divisions {1}".format(
-        instance.fullname, instance.division_ids)
-    )
+
+    report = models.ForeignKey(ARARReport)
+    project = models.ForeignKey('projects.Project', related_name="+")
+    final = models.BooleanField(default=False)
+    created = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        """Class opts."""
+
+        app_label = 'pythia'
+        unique_together = ("report", "project", "final")
+        verbose_name = _("Progress report request")
+        verbose_name_plural = _("Progress report requests")
+
+    def __str__(self):
+        """String representation."""
+        return "{0} update of project {1} for ARAR {2}".format(
+            "Final" if self.final else "Progress", self.project_id,
+            self.report_id)
+
+
+def progress_report_updates():
+    """Return the kinds of progress reports an ARAR requests from projects.
+
+    Each kind is a tuple of the project types and status, the report type,
+    the report fields carried over from the previous year, whether the
+    update is final (None for reports without final updates), and the new
+    project status.
+    """
+    from pythia.documents.models import ProgressReport, StudentReport
     from pythia.projects.models import (
         Project, ScienceProject, CoreFunctionProject, StudentProject)
 
+    progress_fields = ("context", "aims", "progress", "implications",
+                       "future")
+    return [
+        ((ScienceProject, CoreFunctionProject), Project.STATUS_ACTIVE,
+         ProgressReport, progress_fields, False, Project.STATUS_UPDATE),
+        ((ScienceProject, CoreFunctionProject), Project.STATUS_CLOSING,
+         ProgressReport, progress_fields, True, Project.STATUS_FINAL_UPDATE),
+        ((StudentProject,), Project.STATUS_ACTIVE,
+         StudentReport, ("progress_report",), None, Project.STATUS_UPDATE),
+    ]
+
+
+def pending_projects(instance):
+    """Return the kinds of updates and project ids pending for an ARAR.
+
+    Projects are nominated for an update through:
 
+    * The project is of a type requiring an update (SP, CF, STP).
+    * The project belongs to a Division nominated in self.divisions.
+    * The project is of a status that requires an update (active or closing).
+
+    Projects of which the ARAR already requested this kind of update are
+    skipped, see ``ProgressReportRequest``.
+    """
     div_ids = instance.division_ids
-    [call_update(
-        Project.objects.get(pk=p), instance) 
-        for p in ScienceProject.objects.filter(
-            program__division__id__in=instance.division_ids,
-            status=Project.STATUS_ACTIVE
-        ).values_list('pk', flat=True)]
-
-    [call_update(
-        Project.objects.get(pk=p), instance, final=True) 
-        for p in ScienceProject.objects.filter(
-            program__division__id__in=instance.division_ids,
-            status=Project.STATUS_CLOSING
-        ).values_list('pk', flat=True)]
-
-    [call_update(
-        Project.objects.get(pk=p), instance) 
-        for p in CoreFunctionProject.objects.filter(
-            program__division__id__in=instance.division_ids,
-            status=Project.STATUS_ACTIVE
-        ).values_list('pk', flat=True)]
-
-    [call_update(
-        Project.objects.get(pk=p), instance, final=True) 
-        for p in CoreFunctionProject.objects.filter(
-            program__division__id__in=instance.division_ids,
-            status=Project.STATUS_CLOSING
-        ).values_list('pk', flat=True)]
-
-    [call_update(
-        Project.objects.get(pk=p), instance) 
-        for p in StudentProject.objects.filter(
-            program__division__id__in=instance.division_ids,
-            status=Project.STATUS_ACTIVE
-        ).values_list('pk', flat=True)]
-    logger.info(
-        "{0} finished requesting progressreports".format(instance.fullname))
+    requested = set(instance.progressreportrequest_set.values_list(
+        "project", "final"))
+    pending = []
+    for update in progress_report_updates():
+        types, status, model, fields, final, target = update
+        pks = [pk for model in types
+               for pk in model.objects.filter(
+                   program__division__id__in=div_ids,
+                   status=status).values_list('pk', flat=True)
+               if (pk, bool(final)) not in requested]
+        pending.append((update, pks))
+    return pending
+
+
+def request_updates(instance, update, pks):
+    """Request one kind of update from projects for an ARAR.
+
+    Existing reports of the year are attached to the ARAR with one UPDATE,
+    missing reports are created with the content of the previous year's
+    reports, and projects change status with one UPDATE, after which the
+    tasks of their documents are synced. Each project is recorded as a
+    ``ProgressReportRequest``.
+
+    Run this within a transaction.
+    """
+    types, status, model, fields, final, target = update
+    attrs = dict(report=instance)
+    if final is not None:
+        attrs["is_final_report"] = final
+
+    reports = model.objects.filter(year=instance.year, project_id__in=pks)
+    existing = set(reports.values_list("project", flat=True))
+    reports.update(**attrs)
+
+    missing = set(pks) - existing
+    previous = dict(
+        (values.pop("project"), values)
+        for values in model.objects.filter(
+            year=instance.year - 1, project_id__in=missing).values(
+            "project", *fields))
+    for pk in pks:
+        if pk in missing:
+            model.objects.create(
+                year=instance.year, project_id=pk,
+                **dict(attrs, **previous.get(pk, {})))
+
+    from pythia.documents.models import Document, sync_document_tasks
+    from pythia.projects.models import Project
+    Project.objects.filter(pk__in=pks).update(
+        status=target, modified=timezone.now())
+    apicache.bump(Project)
+    sync_document_tasks(Document.objects.filter(project_id__in=pks))
+    ProgressReportRequest.objects.bulk_create([
+        ProgressReportRequest(report=instance, project_id=pk,
+                              final=bool(final))
+        for pk in pks])
+    logger.info("{0} requested {1} {2} from {3} projects".format(
+        instance.fullname, len(missing), model._meta.verbose_name_plural,
+        len(pks)))
+
+
+def run_kickoff(kickoff_id):
+    """Run a queued ``ARARKickoff``.
+
+    Updates are requested in batches of ``settings.ARAR_KICKOFF_BATCH_SIZE``
+    projects, each in its own transaction. A failed or interrupted kickoff
+    keeps the completed batches and resumes with the remaining projects.
+    Kickoffs of the same ARAR lock the ARAR, so that they run one at a time.
+    """
+    if not ARARKickoff.objects.filter(
+            pk=kickoff_id, status=ARARKickoff.STATUS_QUEUED).update(
+            status=ARARKickoff.STATUS_RUNNING, started=timezone.now()):
+        logger.info("ARAR kickoff {0} is not queued, skipping".format(
+            kickoff_id))
+        return
+
+    kickoff = ARARKickoff.objects.select_related("report").get(pk=kickoff_id)
+    report = kickoff.report
+    logger.info("{0} started".format(kickoff))
+    batch_size = getattr(settings, "ARAR_KICKOFF_BATCH_SIZE", 50)
+    try:
+        with current_user(), pythia_models.no_revisions():
+            while True:
+                with transaction.atomic():
+                    ARARReport.objects.select_for_update().get(pk=report.pk)
+                    pending = [(update, pks)
+                               for update, pks in pending_projects(report)
+                               if pks]
+                    remaining = sum(len(pks) for update, pks in pending)
+                    if not remaining:
+                        break
+                    update, pks = pending[0]
+                    request_updates(report, update, pks[:batch_size])
+                kickoff.done += len(pks[:batch_size])
+                kickoff.total = kickoff.done + remaining - len(
+                    pks[:batch_size])
+                kickoff.save(update_fields=["done", "total"])
+        kickoff.status = ARARKickoff.STATUS_DONE
+    except Exception:
+        logger.exception("{0} failed".format(kickoff))
+        kickoff.status = ARARKickoff.STATUS_FAILED
+        kickoff.log = traceback.format_exc()
+
+    kickoff.finished = timezone.now()
+    kickoff.save()
+    logger.info("{0} finished".format(kickoff))
+
+
+def kickoff_progress_reports(instance):
+    """Request progress reports for an ARAR in the background.
+
+    The kickoff is enqueued after the request's transaction commits, see
+    ``pythia.tasks.enqueue_on_commit``. A queued kickoff is enqueued again,
+    which resumes a stale one whose job was lost; ``run_kickoff`` starts
+    each kickoff only once.
+    """
+    from pythia import tasks
+    with transaction.atomic():
+        kickoff, created = ARARKickoff.request(instance)
+    tasks.enqueue_arar_kickoff(kickoff)
+    return kickoff
 
 
 def arar_post_save(sender, instance, created, **kwargs):
@@ -401,15 +673,22 @@ def arar_post_save(sender, instance, created, **kwargs):
     An existing ARAR will not request updates.
     """
     if created:
-        logger.info("ARARReport saved as new calls request_progress_reports.")
-        request_progress_reports(instance)
+        logger.info("ARARReport saved as new kicks off progress reports.")
+        kickoff_progress_reports(instance)
 
 signals.post_save.connect(arar_post_save, sender=ARARReport)
 
-def report_divisions_changed(sender, **kwargs):
-    """Call progress reports when ARARReport.divisions are changed."""
-    logger.info("ARARReport.divisions changed: request_progress_reports.")
-    request_progress_reports(kwargs['instance'])
+def report_divisions_changed(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    """Kick off progress reports when ARARReport.divisions are added."""
+    if action != "post_add":
+        return
+    logger.info("ARARReport.divisions added: kick off progress reports.")
+    if reverse:
+        [kickoff_progress_reports(r)
+         for r in ARARReport.objects.filter(pk__in=pk_set)]
+    else:
+        kickoff_progress_reports(instance)
 
 signals.m2m_changed.connect(report_divisions_changed,
-                            sender=ARARReport.divisions.through)
\ No newline at end of file
+                            sender=ARARReport.divisions.through)
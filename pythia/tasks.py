@@ -0,0 +1,131 @@
+"""Background jobs.
+
+Jobs run on a celery worker if ``settings.BROKER_URL`` is configured.
+Otherwise, they run on a pool of ``settings.PDF_BUILD_WORKERS`` threads in
+the web worker process, which bounds concurrent builds per web worker.
+With ``settings.BACKGROUND_JOBS_EAGER``, e.g. in tests, jobs run immediately.
+"""
+from __future__ import (division, print_function, unicode_literals,
+                        absolute_import)
+import logging
+from contextlib import contextmanager
+from multiprocessing.pool import ThreadPool
+import threading
+
+from celery import shared_task
+from django.conf import settings
+from django.db import connection
+
+from pythia.middleware import system_user
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+_deferred = threading.local()
+
+
+def get_pool():
+    """Return the local worker pool, created on first use.
+
+    The pool is created lazily, so that each forked web worker gets its own.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPool(getattr(settings, "PDF_BUILD_WORKERS", 2))
+        return _pool
+
+
+def run_local(func, *args):
+    """Run a job in a local worker thread with its own database connection."""
+    try:
+        func(*args)
+    except Exception:
+        logger.exception("Background job {0}{1} failed".format(
+            func.__name__, args))
+    finally:
+        connection.close()
+
+
+def enqueue(task, *args):
+    """Run a celery task on the configured backend."""
+    if getattr(settings, "BACKGROUND_JOBS_EAGER", False):
+        return task(*args)
+    if getattr(settings, "BROKER_URL", None):
+        return task.delay(*args)
+    get_pool().apply_async(run_local, (task.run,) + args)
+
+
+def enqueue_on_commit(task, *args):
+    """Run a celery task once the current request or block has committed.
+
+    Within ``deferred_jobs``, e.g. in a request, the job is enqueued at the
+    end of the block, after the view's transaction. Repeated jobs are
+    enqueued once. Outside of it, the job is enqueued at once.
+    """
+    pending = getattr(_deferred, "jobs", None)
+    if pending is None:
+        return enqueue(task, *args)
+    if (task, args) not in pending:
+        pending.append((task, args))
+
+
+def defer_jobs():
+    """Collect jobs of ``enqueue_on_commit`` until ``flush_jobs``."""
+    _deferred.jobs = []
+
+
+def flush_jobs(run=True):
+    """Enqueue the collected jobs, unless dropped, and stop collecting."""
+    pending = getattr(_deferred, "jobs", None) or []
+    _deferred.jobs = None
+    if run:
+        for task, args in pending:
+            enqueue(task, *args)
+
+
+@contextmanager
+def deferred_jobs():
+    """Enqueue the jobs requested within a block at its end.
+
+    Requests run within this block, see ``pythia.middleware.DeferredJobs``.
+    The collected jobs are dropped if the block raises an exception.
+    """
+    if getattr(_deferred, "jobs", None) is not None:
+        yield
+        return
+    defer_jobs()
+    try:
+        yield
+    except Exception:
+        flush_jobs(run=False)
+        raise
+    flush_jobs()
+
+
+@shared_task(ignore_result=True)
+def build_pdf(build_id):
+    """Build a queued ``PDFBuild``."""
+    from pythia import pdf
+    with system_user():
+        pdf.run(build_id)
+
+
+def enqueue_pdf_build(pdf_build):
+    """Build a ``PDFBuild`` in the background."""
+    logger.info("Queueing {0}".format(pdf_build))
+    enqueue(build_pdf, pdf_build.pk)
+
+
+@shared_task(ignore_result=True)
+def kickoff_arar(kickoff_id):
+    """Request the progress reports of a queued ``ARARKickoff``."""
+    from pythia.reports.models import run_kickoff
+    run_kickoff(kickoff_id)
+
+
+def enqueue_arar_kickoff(kickoff):
+    """Run an ``ARARKickoff`` in the background once it is committed."""
+    logger.info("Queueing {0}".format(kickoff))
+    enqueue_on_commit(kickoff_arar, kickoff.pk)
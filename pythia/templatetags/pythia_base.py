@@ -173,7 +173,7 @@ def as_latex_table(original, field, tag='section'):
 def user_portfolio(usr, personalise=True):
     """A templatetag to render a Tasks / Portfolio list for a given User.
 
-    The tag requires the outputs of the workhorse functions ``User.tasklist()``
+    The tag requires the outputs of the workhorse functions ``User.inbox()``
     and ``User.portfolio()`` which run optimised db queries to retrieve tasks
     (documents requiring the User's attention) and portfolio (projects in which
     the User participates).
@@ -183,7 +183,7 @@ def user_portfolio(usr, personalise=True):
 
     show_docs: https://github.com/dbca-wa/sdis/issues/184
     """
-    return {'my_tasklist': usr.tasklist,
+    return {'my_tasklist': usr.inbox,
             'my_portfolio': usr.portfolio,
             'my': "my" if personalise else "{0}'s".format(force_str(usr.first_name)),
             'you': "you" if personalise else usr.first_name,
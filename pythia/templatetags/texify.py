@@ -2,24 +2,9 @@
 """Templatetags for Latex markup."""
 from django.template.defaultfilters import stringfilter, register
 from django.utils.safestring import mark_safe
-import pypandoc
-
-REPLACEMENTS = {
-    '&': r'\&',
-    '%': r'\%',
-    '$': r'\$',
-    '#': r'\#',
-    '_': r'\_',
-    '<': r'\textless{}',
-    '>': r'\textgreater',
-    '{': r'\{',
-    '}': r'\}',
-    u'°': r'\textdegree',
-    '~': r'\textasciitilde{}',
-    '^': r'\textasciicircum',
-    '\n': r'\newline ',
-    '\r': r'',
-    }
+
+from pythia import conversion
+from pythia.html2tex import REPLACEMENTS
 
 COLOURUPS = {
     "1": "success",
@@ -56,5 +41,8 @@ def colourise(value):
 @register.filter
 @stringfilter
 def html2latex(value):
-    """Convert an HTML string to a Latex string."""
-    return mark_safe(pypandoc.convert_text(value, 'tex', format='html'))
+    """Convert an HTML string to a Latex string.
+
+    Conversions are cached, see ``pythia.conversion``.
+    """
+    return mark_safe(conversion.html2latex(value))
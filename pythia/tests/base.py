@@ -1,8 +1,10 @@
 from django.conf import settings
+from django.core.cache import cache
 from django.test import TestCase
 from django.test.utils import override_settings
 
 import factory
+from pythia.middleware import reset_system_user
 from pythia.models import (Division, Service, Program)
 from pythia.documents.models import (
     ConceptPlan, ProjectPlan, ProgressReport, ProjectClosure, StudentReport)
@@ -14,7 +16,12 @@ from pythia.projects.models import (
 @override_settings(
     AUTHENTICATION_BACKENDS=('django.contrib.auth.backends.ModelBackend',),)
 class BaseTestCase(TestCase):
-    pass
+
+    def _pre_setup(self):
+        """Clear the caches, which outlive the rolled back test data."""
+        super(BaseTestCase, self)._pre_setup()
+        cache.clear()
+        reset_system_user()
 
 
 class SuperUserFactory(factory.django.DjangoModelFactory):
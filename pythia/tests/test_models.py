@@ -1,24 +1,41 @@
 """Model tests for SDIS."""
 from __future__ import division
 from datetime import datetime
+from unittest import skipUnless
+
+import mock
+import reversion
 
 from django.test import TestCase
 from django.contrib.auth.models import Group
 # from django_fsm.db.fields import TransitionNotAllowed
 from django.core.urlresolvers import reverse
 from django.test import Client
-
-from pythia.models import Program, programs_upload_to
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from reversion.models import Revision
+
+from pythia import tasks
+from pythia.middleware import (
+    current_user, get_current_user, get_system_user, system_user)
+from pythia.models import (
+    Area, Program, User, no_revisions, programs_upload_to)
 from pythia.documents.models import (
     Document, StudentReport, ConceptPlan, ProjectPlan,
     ProgressReport, ProjectClosure)
 from pythia.projects.models import (
-    Project, ProjectMembership, projects_upload_to)
-from pythia.reports.models import ARARReport
+    Project, ProjectMembership, ScienceProject, StudentProject,
+    deferred_cache_refresh, projects_upload_to, refresh_all_project_caches,
+    update_project_caches)
+from pythia.reports.models import (
+    ARARKickoff, ARARReport, ProgressReportRequest, kickoff_progress_reports,
+    request_updates, run_kickoff)
 from .base import (BaseTestCase, ProjectFactory, ScienceProjectFactory,
                    CoreFunctionProjectFactory, CollaborationProjectFactory,
                    StudentProjectFactory, UserFactory, SuperUserFactory,
-                   ProgramFactory, DivisionFactory)
+                   ProgramFactory, DivisionFactory, ServiceFactory)
 
 
 def avail_tx(u, tx, obj):
@@ -84,6 +101,217 @@ class ProgramModelTests(BaseTestCase):
         self.assertEqual(upload_path_calculated, upload_path_handbuilt)
 
 
+class AuditModelTests(BaseTestCase):
+    """Audit tests."""
+
+    def setUp(self):
+        """Create a Program."""
+        self.marge = UserFactory.create(
+            username='marge', first_name='Marge', last_name='Simpson')
+        self.program = ProgramFactory.create(creator=self.marge)
+
+    def user_lookups(self, user=None):
+        """Save the program three times as user, return the user lookups."""
+        with CaptureQueriesContext(connection) as queries:
+            with current_user(user):
+                for i in range(3):
+                    self.program.save()
+        return [q for q in queries.captured_queries
+                if 'FROM "pythia_user"' in q["sql"] and "LIMIT 1" in q["sql"]]
+
+    def test_save_with_current_user(self):
+        """Audit.save does not look up the superuser for a current user."""
+        self.assertEqual(self.user_lookups(self.marge), [])
+        self.assertEqual(self.program.modifier, self.marge)
+
+    def test_save_looks_up_superuser_once(self):
+        """Audit.save looks up the superuser once per process."""
+        self.assertEqual(len(self.user_lookups()), 1)
+        self.assertEqual(len(self.user_lookups()), 0)
+        with system_user():
+            self.assertEqual(len(self.user_lookups()), 0)
+
+    def test_system_user_follows_changes(self):
+        """The cached superuser is looked up again once changed."""
+        first = get_system_user()
+        user = User.objects.get(pk=first.pk)
+        user.is_active = False
+        user.save()
+        self.assertFalse(get_system_user() is first)
+        self.assertFalse(get_system_user().is_active)
+
+    def test_current_user_outside_block(self):
+        """Outside of a block, the current user is the cached superuser."""
+        with self.assertNumQueries(1):
+            users = [get_current_user() for i in range(3)]
+        self.assertEqual(users, [get_system_user()] * 3)
+
+    def test_changes_tracked_on_assignment(self):
+        """Loaded objects keep the loaded values of assigned fields only."""
+        program = Program.objects.get(pk=self.program.pk)
+        self.assertEqual(program._initial, {})
+        name = program.name
+        program.name = "Changed"
+        program.name = "Changed again"
+        program.published = program.published
+        self.assertEqual(program._initial,
+                         {"name": name, "published": program.published})
+        self.assertEqual(program.changed_data, ["name"])
+
+    def test_save_skips_revisions(self):
+        """No-op, cache field and no_revisions saves create no revision."""
+        project = ProjectFactory.create(program=self.program)
+        with reversion.create_revision():
+            reversion.set_comment("Edited.")
+            self.program.save()
+            project.team_list_plain = "Marge Simpson"
+            project.save(update_fields=["team_list_plain"])
+            with no_revisions():
+                self.program.name = "Changed"
+                self.program.save()
+        self.assertFalse(Revision.objects.filter(comment__in=[
+            "Nothing changed.", "Changed team_list_plain.",
+            "Changed name."]).exists())
+
+
+class UserPortfolioTests(BaseTestCase):
+    """User.tasklist and User.portfolio tests."""
+
+    def setUp(self):
+        """Create a program leader and a program."""
+        self.marge = UserFactory.create(
+            username='marge', first_name='Marge', last_name='Simpson')
+        self.program = ProgramFactory.create(program_leader=self.marge)
+        self.service = ServiceFactory.create()
+
+    def create_projects(self, number):
+        """Create projects led by marge, half with documents in review."""
+        projects = [ScienceProjectFactory.create(
+            program=self.program, project_owner=self.marge,
+            creator=self.marge, output_program=self.service)
+            for i in range(number)]
+        Document.objects.filter(project__in=projects[::2]).update(
+            status=Document.STATUS_INREVIEW)
+
+    def get(self, attr):
+        """Return a property of marge and the number of queries it runs."""
+        user = User.objects.get(pk=self.marge.pk)
+        with CaptureQueriesContext(connection) as queries:
+            value = getattr(user, attr)
+        return value, len(queries.captured_queries)
+
+    def test_tasklist_query_count(self):
+        """The tasklist query count does not grow with the portfolio."""
+        self.create_projects(2)
+        small, small_queries = self.get("tasklist")
+        self.create_projects(200)
+        large, large_queries = self.get("tasklist")
+
+        self.assertTrue(large["count"] > small["count"])
+        self.assertEqual(small_queries, large_queries)
+        self.assertTrue(large_queries <= 6)
+
+    def test_portfolio_query_count(self):
+        """The portfolio query count does not grow with the portfolio."""
+        self.create_projects(2)
+        small, small_queries = self.get("portfolio")
+        self.create_projects(50)
+        large, large_queries = self.get("portfolio")
+
+        self.assertEqual(len(small["projects"]["super"]), 2)
+        self.assertEqual(len(large["projects"]["super"]), 52)
+        self.assertEqual(small_queries, large_queries)
+
+    def test_portfolio_stuck(self):
+        """SCD sees the plans of its projects stuck for over two months."""
+        scd, created = Group.objects.get_or_create(name='SCD')
+        self.marge.groups.add(scd)
+        self.marge.division = DivisionFactory.create(slug="BCS")
+        self.marge.save()
+        self.create_projects(1)
+        project = Project.objects.get(project_owner=self.marge)
+        Project.objects.filter(pk=project.pk).update(
+            created=datetime(2000, 1, 1))
+
+        stuck, queries = self.get("portfolio")
+        self.assertEqual(
+            [d.project_id for d in stuck["stuck"]["new"]], [project.pk])
+        self.assertEqual(stuck["stuck"]["pending"], [])
+
+
+class TaskInboxTests(BaseTestCase):
+    """The materialized User.inbox follows User.tasklist."""
+
+    def setUp(self):
+        """Create a project led by marge with bart in the team."""
+        self.marge = UserFactory.create(username='marge')
+        self.bart = UserFactory.create(username='bart')
+        self.program = ProgramFactory.create(program_leader=self.marge)
+        self.project = ScienceProjectFactory.create(
+            program=self.program, project_owner=self.bart,
+            creator=self.bart, output_program=ServiceFactory.create())
+        self.document = self.project.documents.all()[0]
+
+    def assertInbox(self, user):
+        """Assert that the inbox of a user equals the tasklist."""
+        user = User.objects.get(pk=user.pk)
+        inbox, tasklist = user.inbox, user.tasklist
+        for key in ("approvals", "endorsements"):
+            self.assertEqual(set(d.pk for d in inbox[key]),
+                             set(d.pk for d in tasklist[key]))
+        self.assertEqual(inbox["count"], tasklist["count"])
+        return inbox["count"]
+
+    def test_inbox_follows_progress_report_requests(self):
+        """Bulk progress report requests update the inbox."""
+        self.project.status = Project.STATUS_ACTIVE
+        self.project.save()
+        arar = ARARReport.objects.create(
+            year=self.project.year, date_open=datetime.now(),
+            date_closed=datetime.now())
+        arar.divisions.add(self.program.division)
+        self.assertEqual(Project.objects.get(pk=self.project.pk).status,
+                         Project.STATUS_UPDATE)
+        self.assertTrue(self.assertInbox(self.bart) > 0)
+        self.assertInbox(self.marge)
+
+    def test_inbox_follows_documents_and_teams(self):
+        """Document, team and group changes update the inbox."""
+        self.assertTrue(self.assertInbox(self.bart) > 0)
+        self.assertEqual(self.assertInbox(self.marge), 0)
+
+        self.document.status = Document.STATUS_INREVIEW
+        self.document.save()
+        self.assertEqual(self.assertInbox(self.marge), 1)
+
+        lisa = UserFactory.create(username='lisa')
+        membership = ProjectMembership.objects.create(
+            project=self.project, user=lisa,
+            role=ProjectMembership.ROLE_RESEARCH_SCIENTIST)
+        self.assertTrue(self.assertInbox(lisa) > 0)
+        membership.delete()
+        self.assertEqual(self.assertInbox(lisa), 0)
+
+        self.document.status = Document.STATUS_INAPPROVAL
+        self.document.save()
+        scd, created = Group.objects.get_or_create(name='SCD')
+        lisa.groups.add(scd)
+        self.assertEqual(self.assertInbox(lisa), 1)
+        self.assertEqual(self.assertInbox(self.marge), 0)
+        scd.user_set.remove(lisa)
+        self.assertEqual(self.assertInbox(lisa), 0)
+
+        call_command("rebuild_task_inbox", check=True)
+
+    def test_rebuild(self):
+        """The rebuild command restores a lost inbox."""
+        self.bart.tasks.all().delete()
+        self.assertRaises(CommandError, call_command, "rebuild_task_inbox",
+                          check=True)
+        call_command("rebuild_task_inbox")
+        self.assertTrue(self.assertInbox(self.bart) > 0)
+
+
 class ProjectModelTests(BaseTestCase):
     """Base project tests."""
 
@@ -97,6 +325,124 @@ class ProjectModelTests(BaseTestCase):
                          ProjectMembership.ROLE_SUPERVISING_SCIENTIST)
         self.assertEqual(membership.project, project)
 
+    def test_team_changes_refresh_project_once(self):
+        """Team changes within a block update the project caches once."""
+        project = StudentProjectFactory.create()
+        users = [UserFactory.create(username="student{0}".format(i),
+                                    first_name="Lisa",
+                                    last_name="Student{0}".format(i))
+                 for i in range(5)]
+        with CaptureQueriesContext(connection) as queries:
+            with deferred_cache_refresh():
+                for user in users:
+                    ProjectMembership.objects.create(
+                        project=project, user=user,
+                        role=ProjectMembership.ROLE_SUPERVISED_STUDENT)
+        updates = [q for q in queries.captured_queries
+                   if q["sql"].startswith('UPDATE "projects_project"')]
+        self.assertEqual(len(updates), 1)
+
+        project = Project.objects.get(pk=project.pk)
+        self.assertEqual(project.student_list_plain, ", ".join(
+            u.abbreviated_name_no_affiliation for u in users))
+        self.assertEqual(project.team_list_plain,
+                         project.get_team_list_plain())
+
+    def test_academic_supervisor_lists(self):
+        """Student projects cache their academic supervisors."""
+        project = StudentProjectFactory.create()
+        user = UserFactory.create(
+            username="academic", first_name="Ned", last_name="Academic")
+        ProjectMembership.objects.create(
+            project=project, user=user,
+            role=ProjectMembership.ROLE_ACADEMIC_SUPERVISOR)
+
+        project = Project.objects.get(pk=project.pk)
+        self.assertEqual(project.academic_list_plain, user.abbreviated_name)
+        self.assertEqual(project.academic_list_plain_no_affiliation,
+                         user.abbreviated_name_no_affiliation)
+
+    def test_refresh_all_project_caches(self):
+        """All project caches are refreshed in a constant number of queries."""
+        def refresh():
+            Project.objects.update(team_list_plain="")
+            with CaptureQueriesContext(connection) as queries:
+                count = refresh_all_project_caches()
+            return count, len(queries.captured_queries)
+
+        ScienceProjectFactory.create()
+        StudentProjectFactory.create()
+        small, small_queries = refresh()
+        for i in range(10):
+            ScienceProjectFactory.create()
+            StudentProjectFactory.create()
+        large, large_queries = refresh()
+
+        self.assertEqual((small, large), (2, 22))
+        self.assertEqual(small_queries, large_queries)
+        for p in Project.objects.all():
+            self.assertEqual(p.team_list_plain, p.get_team_list_plain())
+            self.assertEqual(p.area_list_nrm_region, p.area_nrm_region)
+
+    @skipUnless(connection.vendor == "postgresql",
+                "Only PostgreSQL updates with one UPDATE per table")
+    def test_update_project_caches_bulk(self):
+        """Fields of any type are written with one UPDATE per table."""
+        science = ScienceProjectFactory.create()
+        student = StudentProjectFactory.create()
+        types = {science.pk: ScienceProject, student.pk: StudentProject}
+        fields = {
+            science.pk: {"team_list_plain": "Marge", "position": None},
+            student.pk: {"team_list_plain": "Lisa", "position": 5,
+                         "student_list_plain": "Lisa Student"},
+        }
+        with CaptureQueriesContext(connection) as queries:
+            update_project_caches(types, fields)
+        updates = [q["sql"] for q in queries.captured_queries
+                   if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 2)
+        self.assertTrue(all("FROM (VALUES" in sql for sql in updates))
+
+        science = Project.objects.get(pk=science.pk)
+        student = Project.objects.get(pk=student.pk)
+        self.assertEqual((science.team_list_plain, science.position),
+                         ("Marge", None))
+        self.assertEqual((student.team_list_plain, student.position,
+                          student.student_list_plain),
+                         ("Lisa", 5, "Lisa Student"))
+
+    def test_project_areas_changed(self):
+        """Area changes update the area lists with one query and UPDATE."""
+        project = ScienceProjectFactory.create()
+        region = Area.objects.create(
+            name="Pilbara", area_type=Area.AREA_TYPE_DPAW_REGION)
+        nrm = Area.objects.create(
+            name="Rangelands", area_type=Area.AREA_TYPE_NRM_REGION)
+        revisions = Revision.objects.count()
+
+        with CaptureQueriesContext(connection) as queries:
+            project.areas.add(region, nrm)
+        # the m2m lookup and insert, the area query and the UPDATE
+        self.assertEqual(len(queries.captured_queries), 4)
+        self.assertEqual(len([q for q in queries.captured_queries
+                              if q["sql"].startswith("UPDATE")]), 1)
+        self.assertEqual(Revision.objects.count(), revisions)
+
+        project = Project.objects.get(pk=project.pk)
+        self.assertEqual(project.area_list_dpaw_region, "Pilbara")
+        self.assertEqual(project.area_list_nrm_region, "Rangelands")
+        self.assertEqual(project.area_list_dpaw_district, "")
+
+        project.areas.remove(region)
+        nrm.project_set.clear()
+        project = Project.objects.get(pk=project.pk)
+        self.assertEqual(project.area_list_dpaw_region, "")
+        self.assertEqual(project.area_list_nrm_region, "")
+
+        region.project_set.add(project)
+        project = Project.objects.get(pk=project.pk)
+        self.assertEqual(project.area_list_dpaw_region, "Pilbara")
+
 
 class ScienceProjectModelTests(BaseTestCase):
     """Tests along the life cycle of a ScienceProject.
@@ -1264,6 +1610,125 @@ class ARARReportModelTests(TestCase):
         self.program1.delete()
         self.program2.delete()
 
+    def test_kickoff_progress_reports(self):
+        """New reports carry over last year's content."""
+        for p in (self.sp, self.cf, self.stp):
+            p.status = Project.STATUS_ACTIVE
+            p.save()
+        ProgressReport.objects.create(
+            project=self.sp, year=self.sp.year - 1, aims="Last year's aims")
+        StudentReport.objects.create(
+            project=self.stp, year=self.sp.year - 1,
+            progress_report="Last year's progress")
+        arar = ARARReport.objects.create(
+            year=self.sp.year, date_open=datetime.now(),
+            date_closed=datetime.now())
+        arar.divisions.add(self.division1)
+
+        pr = ProgressReport.objects.get(project=self.sp, year=arar.year)
+        self.assertEqual(pr.report, arar)
+        self.assertEqual(pr.aims, "Last year's aims")
+        self.assertFalse(pr.is_final_report)
+        sr = StudentReport.objects.get(project=self.stp, year=arar.year)
+        self.assertEqual(sr.progress_report, "Last year's progress")
+        self.assertEqual(
+            set(Project.objects.filter(status=Project.STATUS_UPDATE)),
+            set([self.sp, self.cf, self.stp]))
+
+        self.cf.status = Project.STATUS_CLOSING
+        self.cf.save()
+        kickoff = kickoff_progress_reports(arar)
+        kickoff = ARARKickoff.objects.get(pk=kickoff.pk)
+        self.assertEqual(kickoff.status, ARARKickoff.STATUS_DONE)
+        self.assertEqual((kickoff.done, kickoff.total), (1, 1))
+        pr = ProgressReport.objects.get(project=self.cf, year=arar.year)
+        self.assertTrue(pr.is_final_report)
+        self.assertEqual(ProgressReport.objects.filter(
+            project=self.cf, year=arar.year).count(), 1)
+        self.assertEqual(Project.objects.get(pk=self.cf.pk).status,
+                         Project.STATUS_FINAL_UPDATE)
+
+    def test_kickoff_resumes(self):
+        """A failed kickoff resumes without requesting updates twice."""
+        for p in (self.sp, self.cf, self.stp):
+            p.status = Project.STATUS_ACTIVE
+            p.save()
+        arar = ARARReport.objects.create(
+            year=self.sp.year, date_open=datetime.now(),
+            date_closed=datetime.now())
+        calls = []
+
+        def fail_second_batch(*args):
+            calls.append(args)
+            if len(calls) == 2:
+                raise ValueError("Worker lost")
+            request_updates(*args)
+
+        with self.settings(ARAR_KICKOFF_BATCH_SIZE=1), mock.patch(
+                "pythia.reports.models.request_updates", fail_second_batch):
+            arar.divisions.add(self.division1)
+        kickoff = arar.kickoffs.order_by("-pk")[0]
+        self.assertEqual(kickoff.status, ARARKickoff.STATUS_FAILED)
+        self.assertEqual((kickoff.done, kickoff.total), (1, 3))
+        self.assertEqual(ProgressReportRequest.objects.filter(
+            report=arar).count(), 1)
+
+        kickoff_progress_reports(arar)
+        kickoff = arar.kickoffs.order_by("-pk")[0]
+        self.assertEqual(kickoff.status, ARARKickoff.STATUS_DONE)
+        self.assertEqual((kickoff.done, kickoff.total), (2, 2))
+        self.assertEqual(
+            set(Project.objects.filter(status=Project.STATUS_UPDATE)),
+            set([self.sp, self.cf, self.stp]))
+
+        # Approved updates are not requested again when divisions change
+        Project.objects.filter(status=Project.STATUS_UPDATE).update(
+            status=Project.STATUS_ACTIVE)
+        arar.divisions.add(self.division2)
+        self.assertEqual(Project.objects.get(pk=self.sp.pk).status,
+                         Project.STATUS_ACTIVE)
+        self.assertEqual(ProgressReportRequest.objects.filter(
+            report=arar).count(), 3)
+
+    def test_kickoff_enqueued_after_commit(self):
+        """Kickoffs requested in a transaction are enqueued after it."""
+        for p in (self.sp, self.cf, self.stp):
+            p.status = Project.STATUS_ACTIVE
+            p.save()
+        with self.settings(BACKGROUND_JOBS_EAGER=False), mock.patch(
+                "pythia.tasks.enqueue") as enqueue:
+            with tasks.deferred_jobs():
+                with transaction.atomic():
+                    arar = ARARReport.objects.create(
+                        year=self.sp.year, date_open=datetime.now(),
+                        date_closed=datetime.now())
+                    arar.divisions.add(self.division1)
+                self.assertFalse(enqueue.called)
+        kickoff = arar.kickoffs.get()
+        enqueue.assert_called_once_with(tasks.kickoff_arar, kickoff.pk)
+
+        run_kickoff(kickoff.pk)
+        kickoff = arar.kickoffs.get()
+        self.assertEqual(kickoff.status, ARARKickoff.STATUS_DONE)
+        self.assertEqual(
+            set(Project.objects.filter(status=Project.STATUS_UPDATE)),
+            set([self.sp, self.cf, self.stp]))
+
+    def test_stale_kickoff_resumes(self):
+        """A queued kickoff whose job was lost is stale and resumes."""
+        arar = ARARReport.objects.create(
+            year=self.sp.year, date_open=datetime.now(),
+            date_closed=datetime.now())
+        kickoff = arar.kickoffs.get()
+        ARARKickoff.objects.filter(pk=kickoff.pk).update(
+            status=ARARKickoff.STATUS_QUEUED, created=datetime(2000, 1, 1))
+        self.assertTrue(arar.kickoffs.get().is_stale)
+
+        kickoff_progress_reports(arar)
+        kickoff = arar.kickoffs.get()
+        self.assertEqual(kickoff.status, ARARKickoff.STATUS_DONE)
+        self.assertFalse(kickoff.is_stale)
+
     def test_new_arar(self):
         """Test new ARAR creates updates and changes project status."""
         print("\n  Fast-track {0} to active".format(self.sp.debugname))
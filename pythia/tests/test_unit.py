@@ -1,8 +1,23 @@
 from django.contrib.auth.models import Group
 from django.test import TestCase
 from django.test.client import RequestFactory
+from datetime import timedelta
+from unittest import skipUnless
+import io
+import json
+import mock
+import os
+import re
+import shutil
+import tempfile
 
+import pypandoc
+
+from django.utils import formats, timezone
+
+from pythia import conversion, html2tex, pdf
 from pythia.templatetags.approvals import get_transitions
+from pythia.templatetags.texify import html2latex
 from pythia.documents.models import ConceptPlan
 from pythia.projects.models import (
     Project, ScienceProject, CoreFunctionProject, CollaborationProject,
@@ -47,3 +62,392 @@ class PythiaUtilsTests(TestCase):
         dirty = "test_string`~1!2@3#4$5%6^7&8*9(0)--=+;:'\|,<.>/?asdfqwer.jpg"
         clean = "teststring1234567890asdfqwer.jpg"
         self.assertEqual(texify_filename(dirty), clean)
+
+
+def pandoc_available():
+    """Whether pandoc is installed."""
+    try:
+        return bool(pypandoc.get_pandoc_version())
+    except OSError:
+        return False
+
+
+@mock.patch("pythia.conversion.NATIVE", False)
+@mock.patch("pythia.conversion.pypandoc.get_pandoc_version",
+            mock.Mock(return_value="1.19"))
+class Html2LatexCacheTests(TestCase):
+    """Tests for the cached html2latex filter."""
+
+    def setUp(self):
+        """Start with an empty cache."""
+        conversion.conversions.clear()
+        conversion.conversions.backend.clear()
+
+    @mock.patch("pythia.conversion.pypandoc.convert_text",
+                return_value="\\textbf{bold}")
+    def test_html2latex_converts_once(self, convert_text):
+        """Test that converting the same HTML twice runs pandoc once."""
+        self.assertEqual(html2latex("<b>bold</b>"), "\\textbf{bold}")
+        self.assertEqual(html2latex("<b>bold</b>"), "\\textbf{bold}")
+        self.assertEqual(convert_text.call_count, 1)
+        stats = conversion.stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["memory_hits"], 1)
+
+    @mock.patch("pythia.conversion.pypandoc.convert_text",
+                side_effect=lambda value, to, format: value.upper())
+    def test_html2latex_cache_is_bounded(self, convert_text):
+        """Test that the in-memory cache evicts the least recently used."""
+        conversion.conversions.max_entries = 2
+        try:
+            [html2latex(x) for x in ("a", "b", "a", "c")]
+        finally:
+            conversion.conversions.max_entries = 5000
+        stats = conversion.stats()
+        self.assertEqual(stats["entries"], 2)
+        self.assertEqual(stats["evictions"], 1)
+
+        # "b" was evicted from memory, but is still in the Django cache
+        self.assertEqual(html2latex("b"), "B")
+        self.assertEqual(conversion.stats()["shared_hits"], 1)
+        self.assertEqual(convert_text.call_count, 3)
+
+    @mock.patch("pythia.conversion.pypandoc.convert_text",
+                side_effect=lambda value, to, format: re.sub(
+                    "</?p>", "", value) + "\n")
+    def test_prime_html2latex_converts_in_one_batch(self, convert_text):
+        """Test that primed fragments are converted in one pandoc call."""
+        fragments = ["<p>one</p>", "two", None, "<p>one</p>", ""]
+        results = conversion.prime_html2latex(fragments)
+        self.assertEqual(convert_text.call_count, 1)
+        self.assertEqual(results["<p>one</p>"], "one\n")
+        self.assertEqual(results["None"], "None\n")
+
+        # Rendering now only hits the cache
+        self.assertEqual(html2latex("two"), "two\n")
+        self.assertEqual(convert_text.call_count, 1)
+
+    @mock.patch("pythia.conversion.pypandoc.convert_text",
+                side_effect=lambda value, to, format: value.upper())
+    def test_prime_html2latex_falls_back(self, convert_text):
+        """Test that mangled batches are converted one by one."""
+        results = conversion.prime_html2latex(["a", "b"])
+        self.assertEqual(results["a"], "A")
+        self.assertEqual(results["b"], "B")
+        self.assertEqual(convert_text.call_count, 3)
+
+
+class Html2TexTests(TestCase):
+    """Tests for the native HTML to Latex converter."""
+
+    def test_inline_markup(self):
+        """Test formatting, escaping and whitespace of inline markup."""
+        self.assertEqual(
+            html2tex.convert(
+                "<p>CO<sub>2</sub> at 50%  <b>&amp; </b>10<sup>6</sup> "
+                "&lt;x&gt;</p>"),
+            "CO\\textsubscript{2} at 50\\% \\textbf{\\&} "
+            "10\\textsuperscript{6} \\textless{}x\\textgreater{}\n")
+
+    def test_paragraphs_and_lists(self):
+        """Test paragraphs and tight lists."""
+        self.assertEqual(
+            html2tex.convert("<p>One</p>\n<ul><li>a</li><li>b</li></ul>"),
+            "One\n\n\\begin{itemize}\n\\tightlist\n\\item\n  a\n"
+            "\\item\n  b\n\\end{itemize}\n")
+
+    def test_unsupported_markup(self):
+        """Test that unknown markup is left to pandoc."""
+        for value in ("<h1>Heading</h1>", "<p><img src='x.png'/></p>",
+                      "<p><span style='color: red'>red</span></p>",
+                      "<table><tr><td colspan='2'>x</td></tr></table>"):
+            self.assertRaises(html2tex.Unsupported, html2tex.convert, value)
+
+    @mock.patch("pythia.conversion.pypandoc.convert_text",
+                return_value="\\section{Heading}\n")
+    def test_html2latex_falls_back_to_pandoc(self, convert_text):
+        """Test that html2latex only runs pandoc for unsupported markup."""
+        conversion.conversions.clear()
+        self.assertEqual(html2latex("<p>simple</p>"), "simple\n")
+        self.assertEqual(convert_text.call_count, 0)
+        with mock.patch("pythia.conversion.pypandoc.get_pandoc_version",
+                        return_value="2.7"):
+            self.assertEqual(html2latex("<h1>Heading</h1>"),
+                             "\\section{Heading}\n")
+        self.assertEqual(convert_text.call_count, 1)
+        self.assertEqual(conversion.stats()["native"], 1)
+        self.assertEqual(conversion.stats()["fallbacks"], 1)
+
+    @skipUnless(pandoc_available(), "pandoc is not installed")
+    def test_corpus_matches_pandoc(self):
+        """Test that native conversions keep the words and markup of pandoc.
+
+        Line wrapping and the escaping of some characters differ, so the
+        outputs are compared as sequences of words and of markup commands.
+        """
+        def words(latex):
+            return re.findall(
+                r"[^\W_]+", re.sub(r"\\[a-zA-Z]+", " ", latex), re.UNICODE)
+
+        def commands(latex):
+            return re.findall(
+                r"\\(textbf|emph|textsubscript|textsuperscript|item|href|"
+                r"url|begin|end|tabularnewline)\b", latex)
+
+        corpus = os.path.join(os.path.dirname(__file__),
+                              "html2latex_corpus.json")
+        with io.open(corpus, encoding="utf-8") as f:
+            for value in json.load(f):
+                native = html2tex.convert(value)
+                pandoc = pypandoc.convert_text(value, "tex", format="html")
+                self.assertEqual(words(native), words(pandoc), value)
+                self.assertEqual(commands(native), commands(pandoc), value)
+
+
+class PDFFingerprintTests(TestCase):
+    """Tests for the fingerprint of rendered Latex."""
+
+    def setUp(self):
+        """Create a build directory with an image."""
+        self.directory = tempfile.mkdtemp()
+        self.image = os.path.join(self.directory, "image.png")
+        with open(self.image, "wb") as f:
+            f.write(b"png")
+
+    def tearDown(self):
+        """Remove the build directory."""
+        shutil.rmtree(self.directory)
+
+    def fingerprint(self, timestamp):
+        """Return the fingerprint of a document printed at a timestamp."""
+        output = "Printed {0}\n\\includegraphics{{./image.png}}".format(
+            formats.localize(timestamp))
+        return pdf.fingerprint(output, self.directory, timestamp)
+
+    def test_fingerprint_ignores_timestamp(self):
+        """Test that the print timestamp does not change the fingerprint."""
+        now = timezone.localtime(timezone.now())
+        self.assertEqual(self.fingerprint(now),
+                         self.fingerprint(now - timedelta(days=1)))
+
+    def test_fingerprint_includes_files(self):
+        """Test that changing an included file changes the fingerprint."""
+        now = timezone.localtime(timezone.now())
+        before = self.fingerprint(now)
+        with open(self.image, "wb") as f:
+            f.write(b"a bigger png")
+        self.assertNotEqual(before, self.fingerprint(now))
+
+
+class PDFCompileTests(TestCase):
+    """Tests for the lualatex pass count."""
+
+    def setUp(self):
+        """Create a build directory."""
+        self.directory = tempfile.mkdtemp()
+        self.log = ""
+
+    def tearDown(self):
+        """Remove the build directory."""
+        shutil.rmtree(self.directory)
+
+    def compile(self, *aux):
+        """Compile with fake lualatex passes writing ``aux``, return passes.
+        """
+        passes = []
+
+        def lualatex(cmd, cwd):
+            content = aux[min(len(passes), len(aux) - 1)]
+            passes.append(cmd)
+            for ext, text in (("aux", content), ("log", self.log)):
+                path = os.path.join(self.directory, "doc." + ext)
+                with open(path, "w") as f:
+                    f.write(text)
+
+        with mock.patch("pythia.pdf.subprocess.check_output",
+                        side_effect=lualatex):
+            pdf.compile_tex(self.directory, "doc")
+        return len(passes)
+
+    def test_one_pass_without_references(self):
+        """Test that documents without references compile in one pass."""
+        self.assertEqual(self.compile("\\relax\n"), 1)
+
+    def test_passes_until_references_converge(self):
+        """Test that lualatex reruns until the references are stable."""
+        self.assertEqual(self.compile(
+            "\\newlabel{LastPage}{{}{1}}\n",
+            "\\newlabel{LastPage}{{}{3}}\n"), 3)
+
+    def test_references_from_previous_build(self):
+        """Test that unchanged references of the last build are reused."""
+        self.compile("\\newlabel{LastPage}{{}{3}}\n")
+        self.assertEqual(self.compile("\\newlabel{LastPage}{{}{3}}\n"), 1)
+
+    def test_rerun_warning(self):
+        """Test that rerun warnings are obeyed up to LATEX_MAX_PASSES."""
+        self.log = "LaTeX Warning: Label(s) may have changed. Rerun to get..."
+        with self.settings(LATEX_MAX_PASSES=4):
+            self.assertEqual(self.compile("\\relax\n"), 4)
+
+
+class PDFDirectoryTests(TestCase):
+    """Tests for the scratch directories of PDF builds."""
+
+    def setUp(self):
+        """Use a temporary MEDIA_ROOT."""
+        self.media_root = tempfile.mkdtemp()
+        self.project = ProjectFactory.create()
+
+    def tearDown(self):
+        """Remove the temporary MEDIA_ROOT."""
+        shutil.rmtree(self.media_root)
+
+    def test_builds_do_not_share_directories(self):
+        """Test that concurrent builds of an object get separate directories.
+        """
+        with self.settings(MEDIA_ROOT=self.media_root):
+            first = pdf.prepare_directory(self.project, "doc")
+            second = pdf.prepare_directory(self.project, "doc")
+        self.assertNotEqual(first, second)
+        self.assertEqual(os.path.dirname(first), os.path.dirname(second))
+        self.assertIn("projects.project", first)
+        self.assertTrue(os.path.islink(os.path.join(first, "media")))
+
+    def test_publish_replaces_current_build(self):
+        """Test that publishing keeps the references for the next build."""
+        with self.settings(MEDIA_ROOT=self.media_root):
+            first = pdf.prepare_directory(self.project, "doc")
+            with open(os.path.join(first, "doc.aux"), "w") as f:
+                f.write("\\newlabel{LastPage}{{}{3}}\n")
+            pdf.publish(first, "doc")
+            second = pdf.prepare_directory(self.project, "doc")
+            pdf.publish(second, "doc")
+
+            current = os.path.join(os.path.dirname(first), "doc")
+            self.assertEqual(os.path.realpath(current),
+                             os.path.realpath(second))
+            with open(os.path.join(second, "doc.aux")) as f:
+                self.assertEqual(f.read(), "\\newlabel{LastPage}{{}{3}}\n")
+            # the first build is kept until PDF_BUILD_TIMEOUT
+            self.assertTrue(os.path.isdir(first))
+            with self.settings(PDF_BUILD_TIMEOUT=-1):
+                third = pdf.prepare_directory(self.project, "doc")
+                pdf.publish(third, "doc")
+            self.assertFalse(os.path.exists(first))
+            self.assertFalse(os.path.exists(second))
+
+
+class PDFPartsTests(TestCase):
+    """Tests for documents compiled in parallel parts."""
+
+    def setUp(self):
+        """Create a build directory."""
+        self.directory = tempfile.mkdtemp()
+        self.pages = {"doc-01-a": 3, "doc-02-b": 2, "doc-03-c": 5}
+
+    def tearDown(self):
+        """Remove the build directory."""
+        shutil.rmtree(self.directory)
+
+    def lualatex(self, cmd, cwd):
+        """Fake lualatex: write the PDF, log and a TOC entry of a part."""
+        jobname = cmd[-1][:-len(".tex")]
+        path = os.path.join(self.directory, jobname)
+        with open(path + ".page") as f:
+            first = int(re.search(r"\d+", f.read()).group(0))
+        with open(path + ".pdf", "w") as f:
+            f.write("%PDF")
+        with open(path + ".log", "w") as f:
+            f.write("Output written on {0}.pdf ({1} pages, 100 bytes)."
+                    .format(jobname, self.pages[jobname]))
+        with open(path + ".aux", "w") as f:
+            f.write("\\@writefile{toc}{\\contentsline {chapter}{%s}{%d}"
+                    "{chapter*.2}\\protected@file@percent }\n"
+                    % (jobname, first + 1))
+
+    def test_parts_start_after_preceding_parts(self):
+        """Test that parts are recompiled until their first pages converge.
+        """
+        parts = [(jobname, "") for jobname in sorted(self.pages)]
+        with mock.patch("pythia.pdf.subprocess.check_output",
+                        side_effect=self.lualatex) as lualatex:
+            with self.settings(LATEX_PART_WORKERS=2):
+                first_pages = pdf.compile_parts(self.directory, parts)
+        self.assertEqual(first_pages, [1, 4, 6])
+        # all parts, then the parts after the first one
+        self.assertEqual(lualatex.call_count, 5)
+
+        pdf.write_contents(self.directory, "doc",
+                           [jobname for jobname, output in parts],
+                           first_pages)
+        with open(os.path.join(self.directory, "doc.toc")) as f:
+            toc = f.read()
+        self.assertIn("{doc-02-b}{5}{doc-02-b.2}\\protected@file@percent",
+                      toc)
+        with open(os.path.join(self.directory, "doc.bookmarks")) as f:
+            self.assertIn("\\bookmark[dest={doc-03-c.2},level=0]{doc-03-c}",
+                          f.read())
+
+
+class PDFRenderTests(TestCase):
+    """Tests for rendering documents with parts."""
+
+    class Report(object):
+        """A document with rich text in its main template and parts."""
+
+        def latex_fragments(self):
+            """Return the rich text of the document."""
+            return ["<p>main</p>", "<p>one</p>", "<p>two</p>"]
+
+        def latex_parts(self):
+            """Return two parts with their own rich text."""
+            return [("one", "part", {"text": "<p>one</p>"}),
+                    ("two", "part", {"text": "<p>two</p>"})]
+
+    def setUp(self):
+        """Start with an empty conversion cache."""
+        conversion.conversions.clear()
+        conversion.conversions.backend.clear()
+
+    @mock.patch("pythia.pdf.render_to_string",
+                side_effect=lambda name, context: html2latex(
+                    context.get("text", "<p>main</p>")))
+    @mock.patch("pythia.conversion.pypandoc.convert_text",
+                side_effect=lambda value, to, format: re.sub(
+                    "</?p>", "", value) + "\n")
+    def test_parts_render_primed_fragments(self, convert_text, render):
+        """Test that documents with parts convert rich text in one batch."""
+        with self.settings(LATEX_PARALLEL_PARTS=True):
+            output, parts = pdf.render_document(
+                self.Report(), "arar", {})
+        self.assertEqual(convert_text.call_count, 1)
+        self.assertEqual(output, "main\n")
+        self.assertEqual(parts, [("arar-01-one", "one\n"),
+                                 ("arar-02-two", "two\n")])
+
+
+class PDFFormatTests(TestCase):
+    """Tests for the precompiled formats of the header templates."""
+
+    def document(self, preamble, title):
+        """Return Latex output with a preamble and a per document title."""
+        return "{0}\n{1}\n\\hypersetup{{pdftitle={{{2}}}}}\n".format(
+            preamble, pdf.FORMAT_MARKER, title)
+
+    @mock.patch("pythia.pdf.engine_version", return_value="LuaTeX 1.0")
+    def test_format_per_header_variant(self, engine_version):
+        """Test that documents with the same header share a format."""
+        scrbook = "\\documentclass{scrbook}\n% {0}\n\\usepackage{tikz}"
+        name = pdf.format_name(self.document(scrbook.format("A"), "A"))
+        self.assertEqual(
+            name, pdf.format_name(self.document(scrbook.format("B"), "B")))
+        self.assertNotEqual(
+            name, pdf.format_name(self.document("\\documentclass{book}", "A")))
+        self.assertIsNone(pdf.format_name("\\documentclass{book}"))
+
+    def test_formats_disabled(self):
+        """Test that LATEX_FORMATS turns precompiled formats off."""
+        with self.settings(LATEX_FORMATS=False):
+            self.assertIsNone(pdf.precompiled_format(
+                self.document("\\documentclass{book}", "A")))
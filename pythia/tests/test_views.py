@@ -1,12 +1,23 @@
 """View tests."""
+import csv
+import json
+from StringIO import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
 from django.core.urlresolvers import reverse
+from django.db import connection
 from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
 # from django.test.client import RequestFactory
 from guardian.models import Group
+import mock
 
-from pythia.models import Program
+from pythia import apicache
+from pythia.models import PDFBuild, Program
 from pythia.documents.models import ConceptPlan, ProjectPlan
-from pythia.projects.models import ProjectMembership
+from pythia.projects.models import (
+    Project, ProjectMembership, update_project_caches)
 
 from .base import (BaseTestCase, ScienceProjectFactory,
                    ServiceFactory, DivisionFactory, ProgramFactory,
@@ -234,6 +245,119 @@ class SmokeTest(BaseTestCase):
         res = self.client.get(url)
         assert(res.status_code == 403)
 
+    def api_projects_queries(self):
+        """Return the queries and data of the uncached project list API."""
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get("/api/projects/?format=json")
+        self.assertEqual(res.status_code, 200)
+        return len(queries), json.loads(res.content)
+
+    def test_api_projects_list_queries(self):
+        """The project list API needs the same queries for more projects."""
+        self.client.login(username='admin', password='password')
+        self.api_projects_queries()
+        queries, data = self.api_projects_queries()
+        self.assertEqual(data["count"], 2)
+
+        CoreFunctionProjectFactory.create(program=self.program)
+        CollaborationProjectFactory.create(program=self.program2)
+        StudentProjectFactory.create(program=self.program)
+        more_queries, data = self.api_projects_queries()
+        self.assertEqual(more_queries, queries)
+        self.assertEqual(data["count"], 5)
+        self.assertEqual(
+            set(p["absolute_url"] for p in data["results"]),
+            set(p.get_absolute_url() for p in Project.objects.all()))
+
+    def test_api_projects_conditional(self):
+        """Unchanged project lists return 304 Not Modified."""
+        self.client.login(username='admin', password='password')
+        url = "/api/projects/?format=json"
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=res["ETag"],
+                              HTTP_IF_MODIFIED_SINCE=res["Last-Modified"])
+        self.assertEqual(res.status_code, 304)
+        res = self.client.get(url, HTTP_IF_MODIFIED_SINCE=res["Last-Modified"])
+        self.assertEqual(res.status_code, 304)
+
+        self.science_project.title = "Changed"
+        self.science_project.save()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=res["ETag"])
+        self.assertEqual(res.status_code, 200)
+
+    def test_api_list_cache(self):
+        """Repeated lists are cached until their models change."""
+        self.client.login(username='admin', password='password')
+        url = "/api/programs/?format=json&published=True"
+        res = self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            cached = self.client.get(url)
+        self.assertEqual(cached.content, res.content)
+        self.assertFalse(
+            [q for q in queries if '"pythia_program"' in q["sql"]])
+        self.assertEqual(
+            apicache.stats(["ProgramViewSet"])["ProgramViewSet"],
+            {"hits": 1, "misses": 1, "hit_ratio": 0.5})
+
+        self.program.name = "Renamed"
+        self.program.save()
+        self.assertIn("Renamed", self.client.get(url).content)
+
+    def test_warm_cache(self):
+        """The warmed lists are served from the cache."""
+        out = StringIO()
+        call_command("warm_cache", site_url="http://testserver", stdout=out)
+        self.assertIn("/api/programs/?format=json: status 200", out.getvalue())
+        self.assertIn("Cache conversions (", out.getvalue())
+
+        self.client.login(username='admin', password='password')
+        res = self.client.get("/api/programs/?format=json")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            apicache.stats(["ProgramViewSet"])["ProgramViewSet"]["hits"], 1)
+
+    def test_api_projects_conditional_cache_refresh(self):
+        """Refreshing cached project fields changes the list's ETag."""
+        self.client.login(username='admin', password='password')
+        url = "/api/projects/?format=json"
+        res = self.client.get(url)
+        modified = Project.objects.get(pk=self.science_project.pk).modified
+
+        update_project_caches(
+            {self.science_project.pk: type(self.science_project)},
+            {self.science_project.pk: {"team_list_plain": "Changed"}})
+        self.assertEqual(
+            Project.objects.get(pk=self.science_project.pk).modified, modified)
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=res["ETag"])
+        self.assertEqual(res.status_code, 200)
+
+    @override_settings(API_EXPORT_CHUNK_SIZE=1)
+    def test_api_projects_export(self):
+        """Project exports stream all projects in chunks."""
+        self.client.login(username='admin', password='password')
+        res = self.client.get("/api/projects/?format=json&export")
+        self.assertTrue(res.streaming)
+        data = json.loads(b"".join(res.streaming_content))
+        self.assertEqual(
+            sorted(p["id"] for p in data),
+            sorted([self.science_project.pk, self.science_project2.pk]))
+
+        res = self.client.get("/api/projects/?format=csv")
+        self.assertTrue(res.streaming)
+        rows = list(csv.DictReader(
+            b"".join(res.streaming_content).splitlines()))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]["program.name"], "ScienceProgram")
+
+    def test_benchmark_project_api(self):
+        """The API benchmark discards its seeded projects."""
+        out = StringIO()
+        call_command("benchmark_project_api", projects=20, stdout=out)
+        self.assertIn("Seeded 20 projects, 22 in total.", out.getvalue())
+        self.assertEqual(Project.objects.count(), 2)
+
 # TEST: User adds external user, enter username, password
 # next screen add first name, last name etc, username must be ro
 # check superuser fields are ro
@@ -511,4 +635,30 @@ class ProjectPlanAdminTests(BaseTestCase):
         # # self.assertEqual(response.status_code, 200)
         # self.assert_200(pdf_url)
         # # self.assert_200(tex_url)
-        # # self.assert_200(html_url)
\ No newline at end of file
+        # # self.assert_200(html_url)
+
+    @mock.patch("pythia.pdf.render", return_value="\\documentclass{scrreprt}")
+    @mock.patch("pythia.pdf.build", return_value=(None, "lualatex log"))
+    def test_projectplan_pdf_build(self, build, render):
+        """Test that a PDF export is a build with a status page."""
+        info = self.spp._meta.app_label, self.spp._meta.model_name
+        pdf_url = reverse(
+            'admin:%s_%s_download_pdf' % info, args=(self.spp.id,))
+
+        self.client.login(username='bob', password='password')
+        response = self.client.get(pdf_url)
+
+        pdf_build = PDFBuild.objects.get()
+        status_url = reverse('admin:%s_%s_download_pdf_status' % info,
+                             args=(self.spp.id, pdf_build.id))
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response["Location"].endswith(status_url))
+        self.assertEqual(build.call_count, 1)
+        self.assertEqual(pdf_build.template, "doc_projectplan")
+        self.assertEqual(pdf_build.status, PDFBuild.STATUS_FAILED)
+        self.assertEqual(pdf_build.log, "lualatex log")
+
+        response = self.client.get(status_url, {"format": "json"})
+        self.assertEqual(json.loads(response.content)["status"], "failed")
+        response = self.client.get(status_url)
+        self.assertEqual(response.status_code, 200)
\ No newline at end of file
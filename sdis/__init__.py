@@ -0,0 +1,4 @@
+from __future__ import absolute_import
+
+# Load the celery app so that shared tasks use it
+from .celery import app as celery_app  # noqa
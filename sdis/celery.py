@@ -0,0 +1,15 @@
+"""Celery app for SDIS background jobs.
+
+Celery is used if ``BROKER_URL`` is configured, see ``pythia.tasks``.
+Run a worker with ``celery -A sdis worker``.
+"""
+from __future__ import absolute_import
+import os
+
+from celery import Celery
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "sdis.settings")
+
+app = Celery("sdis")
+app.config_from_object("django.conf:settings")
+app.autodiscover_tasks(["pythia"])
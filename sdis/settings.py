@@ -5,8 +5,10 @@ Tests run by `fab test` explicitly use `sdis/test_settings.py`.
 """
 from confy import env, database  # cache
 # import ldap
+import multiprocessing
 import os
 import sys
+import tempfile
 from unipath import Path
 
 # from django_auth_ldap.config import (LDAPSearch, GroupOfNamesType, LDAPSearchUnion)
@@ -93,6 +95,8 @@ MIDDLEWARE_CLASSES = (
     'corsheaders.middleware.CorsMiddleware',
     'pythia.middleware.SSOLoginMiddleware',
     'pythia.middleware.ThreadLocals',
+    'pythia.middleware.DeferredCacheRefresh',
+    'pythia.middleware.DeferredJobs',
     # loaded if DEBUG (below):
     # 'debug_toolbar.middleware.DebugToolbarMiddleware',
     # 'django_pdb.middleware.PdbMiddleware'
@@ -110,10 +114,98 @@ TEMPLATE_CONTEXT_PROCESSORS = (
 )
 
 
-CACHES = {
-    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', }
-    # {"BACKEND": "django.core.cache.backends.db.DatabaseCache",'LOCATION': 'django_cache_table'}
-}
+# One cache shared by all workers: Redis at CACHE_URL, e.g.
+# redis://localhost:6379/1, else files in CACHE_DIR shared on one host.
+# Keys are prefixed per site and release. Pandoc conversions are kept
+# apart in the cache "conversions", so that a report's rich text does not
+# evict the API list generations.
+CACHE_URL = env('CACHE_URL', default=None)
+CACHE_KEY_PREFIX = '{0}:{1}'.format(
+    env('CACHE_SITE', default='sdis'), APPLICATION_VERSION_NO)
+# Default timeout, also of counters, which incr() sets again
+CACHE_TIMEOUT = env('CACHE_TIMEOUT', default=60 * 60 * 24 * 30)
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': CACHE_URL,
+            'KEY_PREFIX': CACHE_KEY_PREFIX,
+            'TIMEOUT': CACHE_TIMEOUT,
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+                # Work uncached while Redis is unavailable
+                'IGNORE_EXCEPTIONS': True,
+            },
+        }
+    }
+    CACHES['conversions'] = dict(
+        CACHES['default'], KEY_PREFIX=CACHE_KEY_PREFIX + ':pandoc')
+else:
+    # Each file cache counts its directory on every set, and culls a third
+    # of its entries beyond MAX_ENTRIES
+    CACHE_DIR = env('CACHE_DIR', default=os.path.join(
+        tempfile.gettempdir(), 'sdis-cache'))
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(CACHE_DIR, 'default'),
+            'KEY_PREFIX': CACHE_KEY_PREFIX,
+            'TIMEOUT': CACHE_TIMEOUT,
+            'OPTIONS': {
+                'MAX_ENTRIES': env('CACHE_MAX_ENTRIES', default=5000),
+            },
+        },
+        'conversions': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(CACHE_DIR, 'conversions'),
+            'KEY_PREFIX': CACHE_KEY_PREFIX,
+            'TIMEOUT': CACHE_TIMEOUT,
+            'OPTIONS': {
+                'MAX_ENTRIES': env('CONVERSION_CACHE_MAX_ENTRIES',
+                                   default=50000),
+            },
+        },
+    }
+
+# Pandoc conversions (html2latex) are cached in memory and in this cache
+PANDOC_CACHE_ALIAS = 'conversions'
+PANDOC_CACHE_MAX_ENTRIES = env('PANDOC_CACHE_MAX_ENTRIES', default=5000)
+PANDOC_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+# Convert simple HTML in-process, see pythia.html2tex
+PANDOC_NATIVE_HTML2LATEX = env('PANDOC_NATIVE_HTML2LATEX', default=True)
+# Fragments per batched pandoc call, and parallel pandoc calls per report
+PANDOC_BATCH_SIZE = env('PANDOC_BATCH_SIZE', default=200)
+PANDOC_BATCH_WORKERS = env('PANDOC_BATCH_WORKERS', default=4)
+
+# Projects per batch when refreshing all cached project lists
+PROJECT_CACHE_BATCH_SIZE = env('PROJECT_CACHE_BATCH_SIZE', default=500)
+# Projects per page of the project list API
+API_PROJECT_PAGE_SIZE = env('API_PROJECT_PAGE_SIZE', default=100)
+# Objects read per query when streaming API exports
+API_EXPORT_CHUNK_SIZE = env('API_EXPORT_CHUNK_SIZE', default=500)
+# Rendered API lists are cached in this cache, see pythia.apicache
+API_CACHE_ALIAS = 'default'
+API_CACHE_TIMEOUT = env('API_CACHE_TIMEOUT', default=60 * 60)
+
+# Background jobs run on celery if a broker is configured, else in-process
+BROKER_URL = env('BROKER_URL', default=None)
+CELERY_ACCEPT_CONTENT = ['json']
+CELERY_TASK_SERIALIZER = 'json'
+# Concurrent PDF builds per web worker without a broker
+PDF_BUILD_WORKERS = env('PDF_BUILD_WORKERS', default=2)
+# Pending PDF builds older than this many seconds are considered lost
+PDF_BUILD_TIMEOUT = 60 * 60
+# Projects per transaction when an ARAR requests progress reports
+ARAR_KICKOFF_BATCH_SIZE = env('ARAR_KICKOFF_BATCH_SIZE', default=50)
+# Maximum lualatex passes until cross-references converge
+LATEX_MAX_PASSES = 5
+# Compile the chapters of long documents (the ARAR) as parallel parts
+LATEX_PARALLEL_PARTS = env('LATEX_PARALLEL_PARTS', default=True)
+LATEX_PART_WORKERS = env('LATEX_PART_WORKERS',
+                         default=multiprocessing.cpu_count())
+# Load the Latex header templates from formats precompiled with mylatexformat
+LATEX_FORMATS = env('LATEX_FORMATS', default=True)
+LATEX_FORMAT_DIR = env('LATEX_FORMAT_DIR', default=None)
 
 # I8n
 LANGUAGE_CODE = 'en-au'
@@ -251,6 +343,10 @@ REST_FRAMEWORK = {
     #     'rest_framework_swagger.views.get_restructuredtext',
 
     'DEFAULT_FILTER_BACKENDS': ('rest_framework.filters.DjangoFilterBackend',),
+
+    # Clients can request a page size up to MAX_PAGINATE_BY with ?page_size=
+    'PAGINATE_BY_PARAM': 'page_size',
+    'MAX_PAGINATE_BY': 1000,
     'DEFAULT_RENDERER_CLASSES': (
         'rest_framework.renderers.BrowsableAPIRenderer',
         'rest_framework.renderers.JSONRenderer',
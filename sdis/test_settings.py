@@ -4,6 +4,8 @@ Patch geos:
 https://stackoverflow.com/questions/18643998/geodjango-geosexception-error
 """
 
+import tempfile
+
 from .settings import *
 
 # Additional apps required for testing.
@@ -23,4 +25,19 @@ NOSE_ARGS = [
     '--verbosity=3',
     '--detailed-errors']
 
-CACHES = {"default": {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', }}  # noqa
+# Run background jobs, e.g. PDF builds, synchronously
+BACKGROUND_JOBS_EAGER = True
+
+# Private file-based caches standing in for the shared caches
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': tempfile.mkdtemp(prefix='sdis-test-cache-'),
+        'KEY_PREFIX': CACHE_KEY_PREFIX,  # noqa
+    },
+    'conversions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': tempfile.mkdtemp(prefix='sdis-test-conversions-'),
+        'KEY_PREFIX': CACHE_KEY_PREFIX,  # noqa
+    },
+}